@@ -1,110 +1,440 @@
 # In src/image_scorer.py
+import os
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from PIL import Image
 import torch # Import PyTorch
-from torchvision import transforms # For PyTorch image preprocessing
+import torch.nn.functional as F # For tensor-side resizing
+
+# Optional Numba support for the fused technical-score kernel. Opt-in (PLANIFY_NUMBA_TECH=1):
+# it is a serial scalar loop, and the two SIMD OpenCV passes stay the default until it is benchmarked
+USE_NUMBA_TECH = os.getenv("PLANIFY_NUMBA_TECH", "0") == "1"
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except Exception:
+    _NUMBA_AVAILABLE = False
 # Remove TensorFlow/Keras specific imports if no longer needed
 # import tensorflow as tf
 # from tensorflow.keras.applications.efficientnet import preprocess_input as efficientnet_preprocess
 
+# Images whose technical score is below this floor are not sent through the
+# semantic/engagement models (they would be discarded anyway)
+MIN_TECH = float(os.getenv("MIN_TECH_SCORE", 3.0))
+
+# NIMA's input is resized from a working copy whose longest side is at most this many pixels.
+# Technical stats are NOT taken on it: the Laplacian variance grows 10-100x when an image is
+# shrunk, and the blur divisor in _technical_score_from_stats is calibrated at native resolution
+TECH_MAX_SIDE = 512
+
+# CPU technical scoring runs here, concurrently with model inference
+# (OpenCV, and the nogil Numba kernel when enabled, release the GIL)
+_TECH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
 # --- Technical & Semantic Scores (Placeholders remain) ---
+def _tech_stats_cv2(gray):
+    """Returns (laplacian_variance, mean_intensity) of a grayscale image using OpenCV."""
+    # CV_16S holds any uint8 Laplacian exactly and writes 4x fewer bytes than CV_64F;
+    # cv2.meanStdDev/cv2.mean are single SIMD passes with no numpy temporaries
+    _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+    laplacian_var = float(lap_std[0, 0]) ** 2
+    mean_exposure = cv2.mean(gray)[0]
+    return laplacian_var, mean_exposure
+
+if _NUMBA_AVAILABLE:
+    # Not parallel=True: images are scored concurrently from _TECH_POOL, and numba's
+    # default (workqueue) threading layer must not be entered from several threads
+    @njit(fastmath=True, cache=True, nogil=True)
+    def _tech_stats_numba(gray):
+        """
+        Single pass over 'gray' computing the 3x3 Laplacian variance
+        ([0,1,0; 1,-4,1; 0,1,0], reflect-101 borders like cv2.Laplacian) and the mean intensity.
+        """
+        h, w = gray.shape
+        total = 0.0
+        lap_sum = 0.0
+        lap_sq_sum = 0.0
+        for i in range(h):
+            up = i - 1 if i > 0 else 1
+            down = i + 1 if i < h - 1 else h - 2
+            row_total = 0.0
+            row_lap = 0.0
+            row_lap_sq = 0.0
+            for j in range(w):
+                left = j - 1 if j > 0 else 1
+                right = j + 1 if j < w - 1 else w - 2
+                g = np.float64(gray[i, j])
+                lap = (np.float64(gray[up, j]) + np.float64(gray[down, j])
+                       + np.float64(gray[i, left]) + np.float64(gray[i, right]) - 4.0 * g)
+                row_total += g
+                row_lap += lap
+                row_lap_sq += lap * lap
+            total += row_total
+            lap_sum += row_lap
+            lap_sq_sum += row_lap_sq
+        n = h * w
+        lap_mean = lap_sum / n
+        return lap_sq_sum / n - lap_mean * lap_mean, total / n
+
+def _tech_stats(gray):
+    """Uses OpenCV, or the fused Numba kernel when USE_NUMBA_TECH is set and numba is installed."""
+    if USE_NUMBA_TECH and _NUMBA_AVAILABLE and gray.shape[0] > 1 and gray.shape[1] > 1:
+        return _tech_stats_numba(gray)
+    return _tech_stats_cv2(gray)
+
+def _as_uint8(image_array):
+    """Returns the array as uint8, copying only when the dtype actually differs."""
+    return image_array if image_array.dtype == np.uint8 else image_array.astype(np.uint8, copy=False)
+
+def _is_rgb(image_array):
+    return image_array is not None and image_array.ndim == 3 and image_array.shape[2] == 3
+
+def _tech_size(h, w):
+    """(new_w, new_h) for the technical-score copy, or None if no downscale is needed."""
+    scale = TECH_MAX_SIDE / max(h, w)
+    if scale >= 1:
+        return None
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+def _downscale(image_array):
+    """
+    Working copy with the longest side <= TECH_MAX_SIDE (INTER_AREA) that the NIMA
+    input is derived from, so the full-resolution image is resized only once.
+    """
+    image_array = _as_uint8(image_array)
+    size = _tech_size(*image_array.shape[:2])
+    if size is None:
+        return image_array
+    return cv2.resize(image_array, size, interpolation=cv2.INTER_AREA)
+
+def _technical_score_from_stats(laplacian_var, mean_exposure):
+    """
+    Maps (laplacian_variance, mean_intensity) to the technical quality score (0-10).
+    The stats must come from the native-resolution image (see TECH_MAX_SIDE).
+    """
+    blur_score = np.clip(laplacian_var / 50, 0, 10)
+    exposure_score = 10 - (abs(127.5 - mean_exposure) / 12.75)
+    # TODO: Add Composition Score
+    final_tech_score = (blur_score + exposure_score) / 2
+    return final_tech_score
+
 def get_technical_score(image_array):
     """Calculates the technical quality score (0-10)."""
     try:
         # Simple check for valid array
-        if image_array is None or image_array.ndim != 3 or image_array.shape[2] != 3:
+        if not _is_rgb(image_array):
              print("   - Warning: Invalid array received in get_technical_score.")
              return 0.0
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-        blur_score = np.clip(laplacian_var / 50, 0, 10)
-        mean_exposure = np.mean(gray)
-        exposure_score = 10 - (abs(127.5 - mean_exposure) / 12.75)
-        # TODO: Add Composition Score
-        final_tech_score = (blur_score + exposure_score) / 2
-        return final_tech_score
+        gray = cv2.cvtColor(_as_uint8(image_array), cv2.COLOR_RGB2GRAY) # Native resolution
+        laplacian_var, mean_exposure = _tech_stats(gray)
+        return _technical_score_from_stats(laplacian_var, mean_exposure)
     except Exception as e:
         print(f"   - Warning: Technical scoring failed. Returning 0. Error: {e}")
         return 0.0
 
+def _downscale_and_score(image_array):
+    """
+    Returns (working_copy, technical_score) so callers can reuse the downscaled copy;
+    the score itself is taken on the full-resolution image.
+    """
+    try:
+        small = _downscale(image_array)
+    except Exception:
+        small = image_array
+    return small, get_technical_score(image_array)
+
 def get_semantic_score(image_array, yolo_model):
     """Calculates the semantic (content) score (0-10). Placeholder."""
+    return get_semantic_scores([image_array], yolo_model)[0]
+
+def get_semantic_scores(image_arrays, yolo_model):
+    """
+    Batched semantic scoring: one score (0-10) per image. Placeholder.
+    Once YOLO is wired in, pass the whole list in a single call
+    (yolo_model(image_arrays, verbose=False)) so Ultralytics batches internally.
+    """
     # TODO: Implement YOLO logic here
     if yolo_model is None:
-        return np.random.uniform(4, 8) # Placeholder
-    return 7.0 # Placeholder
+        return np.random.uniform(4, 8, size=len(image_arrays)) # Placeholder
+    return np.full(len(image_arrays), 7.0) # Placeholder
 
-# --- Define PyTorch Preprocessing Transform for NIMA ---
+# --- Define PyTorch Preprocessing for NIMA ---
 # This should match the preprocessing used during your PyTorch training
-NIMA_TRANSFORM = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-])
+# (Resize((224, 224)) -> ToTensor() -> Normalize(mean, std)), done directly on tensors
+# so the numpy image never makes a round-trip through PIL.
+NIMA_INPUT_SIZE = (224, 224)
+NIMA_MEAN = [0.485, 0.456, 0.406]
+NIMA_STD = [0.229, 0.224, 0.225]
 
-# --- UPDATED get_engagement_score for PyTorch ---
-def get_engagement_score(image_array, nima_model_pt, emotion_model, device):
+# Small constant tensors, created once per device instead of per image
+_CACHE = {}
+
+def _consts(device):
     """
-    Calculates the engagement (aesthetics + emotion) score (0-10).
-    Uses the loaded PyTorch NIMA model.
+    Per-device singletons:
+    'mean'/'std' (NIMA normalization, pre-scaled by 255 so raw uint8 pixels can be normalized directly),
+    and 'scores' (NIMA score bins 1..10).
+    """
+    c = _CACHE.get(device)
+    if c is None:
+        c = {
+            "mean": torch.tensor(NIMA_MEAN, device=device).view(1, 3, 1, 1) * 255,
+            "std": torch.tensor(NIMA_STD, device=device).view(1, 3, 1, 1) * 255,
+            "scores": torch.arange(1, 11, dtype=torch.float32, device=device),
+        }
+        _CACHE[device] = c
+    return c
+
+class _PinnedStager:
+    """
+    Double-buffered pinned host staging for H2D uploads on one CUDA device.
+    Copies are issued non-blocking on a dedicated stream, so while slot k is in
+    flight the next image is staged into the other slot, and transfers overlap
+    the NIMA forward passes already queued on the compute stream.
     """
 
-    # 1. Aesthetic Score (using Local PyTorch NIMA model)
-    aesthetic_score = 0.0
-    if nima_model_pt is not None:
+    def __init__(self, device):
+        self.device = device
+        self.stream = torch.cuda.Stream(device=device)
+        self.buffers = [None, None]
+        self.events = [torch.cuda.Event(), torch.cuda.Event()]
+        self.slot = 0
+
+    def upload(self, image_array):
+        slot = self.slot
+        self.slot ^= 1
+        self.events[slot].synchronize() # Wait until this slot's previous copy has left host memory
+
+        n = image_array.size
+        buffer = self.buffers[slot]
+        if buffer is None or buffer.numel() < n:
+            buffer = self.buffers[slot] = torch.empty(n, dtype=torch.uint8, pin_memory=True)
+        staged = buffer[:n]
+        staged.copy_(torch.from_numpy(image_array).view(-1))
+
+        with torch.cuda.stream(self.stream):
+            x = staged.to(self.device, non_blocking=True)
+            self.events[slot].record(self.stream)
+        compute_stream = torch.cuda.current_stream(self.device)
+        compute_stream.wait_stream(self.stream)
+        x.record_stream(compute_stream)
+        return x.view(image_array.shape)
+
+_STAGERS = {}
+
+def _upload(image_array, device):
+    """Uploads an RGB (H, W, 3) numpy array to 'device' as a raw (1, 3, H, W) uint8 tensor."""
+    # torch.from_numpy is zero-copy; only non-uint8 or non-contiguous inputs are copied
+    image_array = np.ascontiguousarray(_as_uint8(image_array))
+    if torch.device(device).type == "cuda":
+        stager = _STAGERS.get(device)
+        if stager is None:
+            stager = _STAGERS[device] = _PinnedStager(device)
+        x = stager.upload(image_array)
+    else:
+        x = torch.from_numpy(image_array)
+    return x.permute(2, 0, 1).unsqueeze(0)
+
+def _device_downscale(x_u8):
+    """On-device counterpart of _downscale: float (1, 3, h, w) copy with the longest side <= TECH_MAX_SIDE."""
+    x = x_u8.float()
+    size = _tech_size(*x.shape[2:])
+    if size is not None:
+        x = F.interpolate(x, size=(size[1], size[0]), mode="area") # Same downscale as the CPU path
+    return x
+
+def _nima_input(x, device):
+    """Resizes and normalizes a downscaled (1, 3, h, w) float tensor into NIMA's input."""
+    c = _consts(device)
+    mean, std = c["mean"], c["std"]
+    x = F.interpolate(x, size=NIMA_INPUT_SIZE, mode="bilinear", align_corners=False, antialias=True)
+    return x.sub_(mean).div_(std)
+
+def _tech_stats_torch(x, device):
+    """
+    On-device equivalent of _tech_stats for a native-resolution (1, 3, H, W) float tensor.
+    Returns a (2,) tensor [laplacian_variance, mean_intensity], left on the device.
+    """
+    gray = (0.299 * x[:, 0:1] + 0.587 * x[:, 1:2] + 0.114 * x[:, 2:3]).round_() # Same weights/rounding as cv2 RGB2GRAY
+    # 4-neighbour Laplacian (cv2.Laplacian ksize=1) as shifted slices rather than conv2d: the input
+    # size varies per image, and a cuDNN conv would be re-autotuned for every new shape under cudnn.benchmark
+    p = F.pad(gray, (1, 1, 1, 1), mode="reflect")
+    lap = p[..., :-2, 1:-1] + p[..., 2:, 1:-1] + p[..., 1:-1, :-2] + p[..., 1:-1, 2:] - 4 * gray
+    return torch.stack([lap.var(unbiased=False), gray.mean()])
+
+# --- Batch size used when stacking images for a single NIMA forward pass ---
+DEFAULT_CPU_BATCH_SIZE = 8
+MAX_GPU_BATCH_SIZE = 64
+# Rough activation footprint of one 224x224 EfficientNet-B0 sample at inference
+_NIMA_BYTES_PER_SAMPLE = 64 * 1024 * 1024
+
+def default_batch_size(device):
+    """
+    Picks a NIMA batch size for the device (autobatch-style heuristic):
+    on CUDA, fit ~half of the currently free memory; on CPU, a small fixed batch.
+    """
+    if device is not None and torch.device(device).type == "cuda":
+        try:
+            free_bytes, _ = torch.cuda.mem_get_info(device)
+            fit = int(free_bytes * 0.5) // _NIMA_BYTES_PER_SAMPLE
+            return int(np.clip(fit, 1, MAX_GPU_BATCH_SIZE))
+        except Exception:
+            return 16
+    return DEFAULT_CPU_BATCH_SIZE
+
+def _model_dtype(model):
+    """Input dtype expected by the model (FP16/BF16 when it was halved at load time)."""
+    if isinstance(model, torch.nn.Module):
+        for param in model.parameters():
+            return param.dtype
+    return torch.float32
+
+# Inference only: inference_mode also skips the version-counter/view tracking no_grad keeps
+@torch.inference_mode()
+def _score_on_device(image_arrays, nima_model_pt, device, batch_size=None, with_tech=False, min_tech=None):
+    """
+    Uploads each image to 'device' once and, per batch, runs NIMA on the stacked inputs.
+    With 'with_tech', the technical stats are computed on the same uploaded (native-resolution) buffers
+    (used on CUDA so the CPU grayscale pass is skipped); with 'min_tech' as well,
+    images below that technical score are left out of the NIMA batch.
+    Returns (aesthetic_scores, technical_scores or None) as numpy arrays.
+    """
+    n = len(image_arrays)
+    aesthetic_scores = np.full(n, 5.0, dtype=np.float32) # Average score if model is missing or fails
+    technical_scores = np.zeros(n, dtype=np.float32) if with_tech else None
+    if n == 0 or (nima_model_pt is None and not with_tech):
+        return aesthetic_scores, technical_scores
+
+    if batch_size is None:
+        batch_size = default_batch_size(device)
+    score_values = _consts(device)["scores"] # Scores 1 to 10
+    model_dtype = _model_dtype(nima_model_pt)
+    tech_idx, tech_stats = [], [] # (2,) device tensors, brought back with a single .cpu() at the end
+    predictions = [] # (row indices, (B,) device tensor), likewise read back after the last batch
+
+    for start in range(0, n, batch_size):
+        chunk = image_arrays[start:start + batch_size]
         try:
-            # Preprocess the numpy array image for PyTorch NIMA model
-            # Convert NumPy array (H, W, C) to PIL Image
-            pil_image = Image.fromarray(image_array.astype(np.uint8))
+            raw = [_upload(a, device) for a in chunk]
+            # Resized once to the working size the NIMA input starts from
+            uploaded = [_device_downscale(x) for x in raw]
+        except Exception as e:
+            print(f"   - Warning: Could not upload a batch of {len(chunk)} images to {device}. Error: {e}")
+            raw = uploaded = None
 
-            # Apply the transforms (Resize, ToTensor, Normalize)
-            image_tensor = NIMA_TRANSFORM(pil_image).unsqueeze(0).to(device) # Add batch dim and send to device
+        keep = list(range(len(chunk)))
+        if with_tech:
+            on_device_ok = False
+            if uploaded is not None:
+                try:
+                    # Native resolution, like the CPU path (the blur divisor depends on it)
+                    chunk_stats = [_tech_stats_torch(x.float(), device) for x in raw]
+                    if min_tech is None:
+                        tech_idx.extend(range(start, start + len(chunk)))
+                        tech_stats.extend(chunk_stats)
+                    else:
+                        # The scores are needed now to drop low-quality images before NIMA (a small 2xB sync)
+                        for k, (laplacian_var, mean_exposure) in enumerate(torch.stack(chunk_stats).cpu().numpy()):
+                            technical_scores[start + k] = _technical_score_from_stats(laplacian_var, mean_exposure)
+                    on_device_ok = True
+                except Exception as e:
+                    # e.g. OOM in the on-device Laplacian: score this batch on the CPU instead of losing it
+                    print(f"   - Warning: On-device technical scoring failed for a batch of {len(chunk)}, using the CPU path. Error: {e}")
+            if not on_device_ok:
+                technical_scores[start:start + len(chunk)] = [get_technical_score(a) for a in chunk]
+            if min_tech is not None:
+                keep = [k for k in keep if technical_scores[start + k] >= min_tech]
 
-            # Perform inference within torch.no_grad() context
-            with torch.no_grad(): # Disable gradient calculations for inference
-                prediction = nima_model_pt(image_tensor)
-                # Check if the output is nested (e.g., from DataParallel)
-                if isinstance(prediction, tuple):
-                    prediction = prediction[0] # Take the first element if it's a tuple
-                prediction = prediction[0] # Get prediction for the first (only) image in batch
+        raw = None # Only the working copies are needed from here on
+        if nima_model_pt is None or uploaded is None or not keep:
+            continue
+        try:
+            # Stack every kept image in the chunk into a single (B, 3, 224, 224) tensor
+            batch_tensor = torch.cat([_nima_input(uploaded[k], device) for k in keep]).to(model_dtype)
+            n_kept = batch_tensor.shape[0]
+            if n_kept < batch_size and (hasattr(nima_model_pt, "_orig_mod")
+                                        or getattr(nima_model_pt, "fixed_batch_size", None)):
+                # torch.compile'd (CUDA-graph) model or fixed-shape TensorRT engine: zero-pad short
+                # batches (tail, tech-filtered) to the full batch shape so one captured graph / built
+                # engine is reused instead of one per size
+                batch_tensor = torch.cat([batch_tensor, batch_tensor.new_zeros((batch_size - n_kept,) + batch_tensor.shape[1:])])
 
-            # Convert prediction tensor (potentially on GPU) to numpy array (on CPU)
-            prediction_np = prediction.cpu().numpy()
+            prediction = nima_model_pt(batch_tensor)
+            # Check if the output is nested (e.g., from DataParallel)
+            if isinstance(prediction, tuple):
+                prediction = prediction[0] # Take the first element if it's a tuple
+            prediction = prediction[:n_kept]
 
-            # Calculate the final mean score (weighted average: sum( score * probability ))
-            scores = np.arange(1, 11, dtype=np.float32) # Scores 1 to 10
-            aesthetic_score = np.sum(prediction_np * scores)
+            # Weighted average per row: sum( score * probability ), reduced on the device in FP32.
+            # This also copies the result out of the output buffer a CUDA-graph model reuses,
+            # and the (B,) tensor stays on the device: syncing here would stall the next batch's uploads.
+            predictions.append(([start + k for k in keep], (prediction.float() * score_values).sum(dim=-1)))
 
+        except Exception as e:
+            print(f"   - Warning: Local PyTorch NIMA scoring failed for a batch of {len(chunk)}. Assigning average score (5.0). Error: {e}")
+
+    if predictions:
+        try:
+            # One D2H copy of B floats per batch, all batches at once
+            rows = [i for batch_rows, _ in predictions for i in batch_rows]
+            aesthetic_scores[rows] = torch.cat([p for _, p in predictions]).cpu().numpy()
         except Exception as e:
             print(f"   - Warning: Local PyTorch NIMA scoring failed. Assigning average score (5.0). Error: {e}")
-            aesthetic_score = 5.0 # Assign an average score if prediction fails
-    else:
-        # print("   - Info: NIMA PyTorch model not loaded, assigning default aesthetic score.")
-        aesthetic_score = 5.0 # Assign average score if model wasn't loaded
 
-    # 2. Emotion Score
-    emotion_score = 0.0
+    if tech_stats:
+        stats = torch.stack(tech_stats).cpu().numpy()
+        for i, (laplacian_var, mean_exposure) in zip(tech_idx, stats):
+            technical_scores[i] = _technical_score_from_stats(laplacian_var, mean_exposure)
+
+    return aesthetic_scores, technical_scores
+
+def get_aesthetic_scores(image_arrays, nima_model_pt, device, batch_size=None):
+    """
+    Runs the PyTorch NIMA model over a list of images in batches and returns
+    one mean aesthetic score (1-10) per image as a numpy array.
+    Batches that fail fall back to an average score (5.0).
+    """
+    return _score_on_device(image_arrays, nima_model_pt, device, batch_size)[0]
+
+def get_emotion_scores(image_arrays, emotion_model):
+    """Calculates one emotion score (0-10) per image."""
+    n = len(image_arrays)
     if emotion_model is None:
         # Placeholder logic if emotion model isn't loaded
-        emotion_score = np.random.uniform(4, 8)
-    else:
-        try:
-            # --- TODO: Implement Your Emotion Model Logic Here ---
-            # Could be PyTorch or TF, adjust accordingly
-            # 1. Preprocess image_array for the emotion model
-            # 2. Run inference: emotions = emotion_model(processed_image)
-            # 3. Score based on detected emotions (e.g., +1 for 'happy', -1 for 'sad')
-            # 4. Return normalized score (0-10)
-            emotion_score = 6.0 # Placeholder
-        except Exception as e:
-            print(f"   - Warning: Emotion scoring failed. Returning 0. Error: {e}")
-            emotion_score = 0.0
+        return np.random.uniform(4, 8, size=n)
+    try:
+        # --- TODO: Implement Your Emotion Model Logic Here ---
+        # Could be PyTorch or TF, adjust accordingly
+        # 1. Preprocess image_arrays for the emotion model
+        # 2. Run inference: emotions = emotion_model(processed_batch)
+        # 3. Score based on detected emotions (e.g., +1 for 'happy', -1 for 'sad')
+        # 4. Return normalized scores (0-10)
+        return np.full(n, 6.0) # Placeholder
+    except Exception as e:
+        print(f"   - Warning: Emotion scoring failed. Returning 0. Error: {e}")
+        return np.zeros(n)
 
+def _combine_engagement(aesthetic_scores, emotion_scores):
     # Average the two engagement scores (ensure aesthetic score is capped at 10)
-    final_engagement_score = (np.clip(aesthetic_score, 0, 10) + emotion_score) / 2
+    final_engagement_scores = (np.clip(aesthetic_scores, 0, 10) + emotion_scores) / 2
     # Clip final score just in case
-    return np.clip(final_engagement_score, 0, 10)
+    return np.clip(final_engagement_scores, 0, 10)
+
+def get_engagement_scores(image_arrays, nima_model_pt, emotion_model, device, batch_size=None):
+    """
+    Batched engagement (aesthetics + emotion) scores (0-10), one per image.
+    """
+    aesthetic_scores = get_aesthetic_scores(image_arrays, nima_model_pt, device, batch_size)
+    emotion_scores = get_emotion_scores(image_arrays, emotion_model)
+    return _combine_engagement(aesthetic_scores, emotion_scores)
+
+# --- UPDATED get_engagement_score for PyTorch ---
+def get_engagement_score(image_array, nima_model_pt, emotion_model, device):
+    """
+    Calculates the engagement (aesthetics + emotion) score (0-10).
+    Uses the loaded PyTorch NIMA model.
+    """
+    return get_engagement_scores([image_array], nima_model_pt, emotion_model, device)[0]
 
 
 # --- get_all_scores (Pass the PyTorch model and device) ---
@@ -112,27 +442,98 @@ def get_all_scores(image_array, models):
     """
     Main function to orchestrate all scoring for a single image.
     'models' is the dictionary of pre-loaded models from main.py.
+    Shares the batched implementation, so both paths score identically.
     """
-    # Ensure image_array is valid before proceeding
-    if image_array is None or not isinstance(image_array, np.ndarray):
-        print("   - Error: Invalid image array received in get_all_scores.")
-        return {
-            "technical_score": 0.0,
-            "semantic_score": 0.0,
-            "engagement_score": 0.0
-        }
+    return get_all_scores_batch([image_array], models)[0]
+
+
+# --- get_all_scores_batch (one model call per batch instead of per image) ---
+def get_all_scores_batch(image_arrays, models, batch_size=None, tech_stats=None):
+    """
+    Batched counterpart of get_all_scores.
+    Scores a list of images, running NIMA (and later YOLO) once per batch of
+    'batch_size' images instead of once per image.
+    'tech_stats' optionally gives each image's (laplacian_variance, mean_intensity) measured
+    on its full-resolution original, for when 'image_arrays' are thumbnails.
+    Returns a list of score dicts in the same order as 'image_arrays'.
+    """
+    results = [
+        {"technical_score": 0.0, "semantic_score": 0.0, "engagement_score": 0.0}
+        for _ in image_arrays
+    ]
+
+    # Invalid entries (not an RGB (H, W, 3) array) keep zero scores and are left out of the
+    # model batches, so one grayscale/RGBA image can't fail the upload of a whole chunk
+    valid_idx = [i for i, a in enumerate(image_arrays) if isinstance(a, np.ndarray) and _is_rgb(a)]
+    if len(valid_idx) != len(image_arrays):
+        print(f"   - Error: {len(image_arrays) - len(valid_idx)} invalid (non-RGB) image array(s) received in get_all_scores_batch.")
+    if not valid_idx:
+        return results
+    valid_arrays = [image_arrays[i] for i in valid_idx]
 
-    tech_score = get_technical_score(image_array)
-    sem_score = get_semantic_score(image_array, models.get("yolo"))
-    eng_score = get_engagement_score(
-        image_array,
-        models.get("nima_pt"), # Get the PyTorch NIMA model instance
-        models.get("emotion"),
-        models.get("device") # Get the device ('cuda' or 'cpu')
-    )
-
-    return {
-        "technical_score": tech_score,
-        "semantic_score": sem_score,
-        "engagement_score": eng_score
-    }
\ No newline at end of file
+    device = models.get("device")
+    if batch_size is None:
+        # The size main.py's load_models settled on (and warmed the compiled model up with)
+        batch_size = models.get("batch_size")
+    # On CUDA the technical stats come from the same uploaded buffers NIMA uses
+    on_device_tech = device is not None and torch.device(device).type == "cuda"
+
+    if tech_stats is not None and all(tech_stats[i] is not None for i in valid_idx):
+        # Stats of a thumbnail would overstate its sharpness, so the precomputed ones are used
+        tech_scores = np.array([_technical_score_from_stats(*tech_stats[i]) for i in valid_idx], dtype=np.float32)
+        keep = np.flatnonzero(tech_scores >= MIN_TECH)
+        aesthetic_scores = np.full(len(valid_arrays), 5.0, dtype=np.float32)
+        if len(keep):
+            aesthetic_scores[keep] = get_aesthetic_scores(
+                [valid_arrays[k] for k in keep], models.get("nima_pt"), device, batch_size
+            )
+    elif on_device_tech:
+        aesthetic_scores, tech_scores = _score_on_device(
+            valid_arrays,
+            models.get("nima_pt"),
+            device,
+            batch_size=batch_size,
+            with_tech=True,
+            min_tech=MIN_TECH
+        )
+        keep = np.flatnonzero(tech_scores >= MIN_TECH)
+    else:
+        # All technical scores are computed in the thread pool; each NIMA batch only waits
+        # for its own images, so later technical scoring overlaps the earlier forward passes
+        n = len(valid_arrays)
+        # NIMA is fed the downscaled working copies instead of resizing full-resolution images again
+        tech_futures = [_TECH_POOL.submit(_downscale_and_score, a) for a in valid_arrays]
+        if batch_size is None:
+            batch_size = default_batch_size(device)
+        tech_scores = np.zeros(n, dtype=np.float32)
+        aesthetic_scores = np.full(n, 5.0, dtype=np.float32)
+        small_arrays = [None] * n
+        for start in range(0, n, batch_size):
+            rows = range(start, min(start + batch_size, n))
+            for i in rows:
+                small_arrays[i], tech_scores[i] = tech_futures[i].result()
+            # Filter the batch before it reaches the models
+            kept_rows = [i for i in rows if tech_scores[i] >= MIN_TECH]
+            if kept_rows:
+                aesthetic_scores[kept_rows] = get_aesthetic_scores(
+                    [small_arrays[i] for i in kept_rows], models.get("nima_pt"), device, batch_size
+                )
+        keep = np.flatnonzero(tech_scores >= MIN_TECH)
+
+    # Images below MIN_TECH keep zero semantic/engagement scores
+    sem_scores = np.zeros(len(valid_arrays))
+    eng_scores = np.zeros(len(valid_arrays))
+    if len(keep):
+        kept_arrays = [valid_arrays[k] for k in keep]
+        sem_scores[keep] = get_semantic_scores(kept_arrays, models.get("yolo"))
+        eng_scores[keep] = _combine_engagement(
+            aesthetic_scores[keep], get_emotion_scores(kept_arrays, models.get("emotion"))
+        )
+
+    for j, i in enumerate(valid_idx):
+        results[i] = {
+            "technical_score": tech_scores[j],
+            "semantic_score": sem_scores[j],
+            "engagement_score": eng_scores[j]
+        }
+    return results
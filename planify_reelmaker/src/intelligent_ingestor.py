@@ -1,8 +1,11 @@
 import os
 import io
+import re
 import cv2
-import imagehash
 import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from PIL import Image
 from moviepy.editor import VideoFileClip
@@ -11,26 +14,57 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 import pillow_heif
 
+# Optional PyAV support: decodes videos straight from the in-memory download
+try:
+    import av
+    _PYAV_AVAILABLE = True
+except Exception:
+    _PYAV_AVAILABLE = False
+
 # --- CONFIGURATION ---
 # Google Drive settings
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 CREDENTIALS_FILE = 'credentials.json' # Make sure this file exists
 
+# Download settings
+DOWNLOAD_WORKERS = 16                   # Files downloaded and decoded concurrently
+DOWNLOAD_CHUNK_SIZE = 50 * 1024 * 1024  # Bytes per Drive download request for large files
+SINGLE_SHOT_MAX_BYTES = 100 * 1024 * 1024 # Files up to this size are fetched in one request
+
+# Local cache of the downloaded (still encoded) files, keyed by Drive fileId + modifiedTime,
+# so re-runs on an unchanged folder skip the download. A file's older versions are evicted.
+USE_CACHE = True
+CACHE_DIR = "cache/drive/"
+
 # Quality filtering thresholds
 BLUR_THRESHOLD = 100.0  # Lower values are more blurry
 EXPOSURE_THRESHOLD_LOW = 30   # Average pixel intensity for underexposure
 EXPOSURE_THRESHOLD_HIGH = 225 # Average pixel intensity for overexposure
 SIMILARITY_THRESHOLD = 5     # pHash distance; lower means more similar
+THUMB_MAX_SIDE = 512         # Longest side of the RGB thumbnail handed to the scorer (image_scorer.TECH_MAX_SIDE)
+PHASH_IMAGE_SIZE = 32        # Side of the grayscale thumbnail the pHash is computed from
+PHASH_HASH_SIZE = 8          # Hash is the PHASH_HASH_SIZE^2 lowest DCT frequencies (64 bits)
 
 # Video processing settings
 SCENE_CHANGE_THRESHOLD = 30.0 # Threshold for detecting a new scene in a video
+SCENE_SAMPLE_FPS = 2          # Frames per second inspected for scene changes
+SCENE_DIFF_SIZE = (160, 90)   # Frames are compared at this (width, height)
+# With PyAV, decode only the video's I-frames (still capped at SCENE_SAMPLE_FPS by timestamp).
+# Skipping P/B-frames skips most of the decode work, but a cut between two I-frames is
+# missed unless the encoder placed one there, so this is off by default
+SCENE_KEYFRAMES_ONLY = False
 
 # --- AUTHENTICATION ---
+_THREAD_LOCAL = threading.local()
+
+def _load_credentials():
+    return service_account.Credentials.from_service_account_file(
+        CREDENTIALS_FILE, scopes=SCOPES)
+
 def get_drive_service():
     """Authenticates with Google Drive API and returns the service object."""
     try:
-        creds = service_account.Credentials.from_service_account_file(
-            CREDENTIALS_FILE, scopes=SCOPES)
+        creds = _load_credentials()
         service = build('drive', 'v3', credentials=creds)
         print("-> Google Drive authentication successful.")
         return service
@@ -40,199 +74,404 @@ def get_drive_service():
         print(f"!!! ERROR: An issue occurred during authentication: {e}")
     return None
 
+def _get_thread_service(creds):
+    """
+    Returns a Drive service for the calling thread.
+    googleapiclient services share one httplib2.Http and are not thread-safe,
+    so each download worker builds (once) its own from the shared credentials.
+    """
+    service = getattr(_THREAD_LOCAL, 'service', None)
+    if service is None:
+        service = _THREAD_LOCAL.service = build('drive', 'v3', credentials=creds)
+    return service
+
 # --- CORE PRE-PROCESSING FUNCTIONS ---
 def filter_media_by_quality(image_array, image_name):
     """
     Performs initial quality checks on an image array (from memory).
     Returns True if the image passes, False otherwise.
     """
+    return _check_quality(image_array, image_name)[0]
+
+def _check_quality(image_array, image_name):
+    """
+    Quality checks behind filter_media_by_quality.
+    Returns (passed, gray32, thumb, stats): gray32 is the 32x32 grayscale thumbnail used for
+    the pHash, so de-duplication reuses this pass instead of re-converting the image;
+    thumb is an RGB copy with the longest side <= THUMB_MAX_SIDE for the scorer, and
+    stats the native-resolution (laplacian_variance, mean_intensity) its technical score needs.
+    """
     try:
         # 1. Blurriness Check using Laplacian Variance
+        # At native resolution: BLUR_THRESHOLD is calibrated for it, and a downscaled copy looks sharper
         gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+        laplacian_var = float(lap_std[0, 0]) ** 2
         if laplacian_var < BLUR_THRESHOLD:
             print(f"   - DISCARDING {image_name}: Blurry (Score: {laplacian_var:.2f})")
-            return False
+            return False, None, None, None
 
         # 2. Exposure Check using histogram analysis
-        mean_exposure = np.mean(gray)
+        mean_exposure = cv2.mean(gray)[0]
         if mean_exposure < EXPOSURE_THRESHOLD_LOW or mean_exposure > EXPOSURE_THRESHOLD_HIGH:
             print(f"   - DISCARDING {image_name}: Bad Exposure (Value: {mean_exposure:.2f})")
-            return False
+            return False, None, None, None
             
-        # If all checks pass
-        return True
+        # If all checks pass: derive both thumbnails (one INTER_AREA pass each)
+        gray32 = cv2.resize(gray, (PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), interpolation=cv2.INTER_AREA)
+        h, w = image_array.shape[:2]
+        scale = THUMB_MAX_SIDE / max(h, w)
+        thumb = image_array
+        if scale < 1:
+            thumb = cv2.resize(image_array, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+        return True, gray32, thumb, (laplacian_var, mean_exposure)
     except Exception as e:
         print(f"   - Warning: Quality check failed for {image_name}. Error: {e}")
-        return False
+        return False, None, None, None
+
+# First PHASH_HASH_SIZE rows of the unnormalized DCT-II matrix (the scipy.fftpack.dct
+# convention imagehash uses), so the 8x8 low frequencies are D @ X @ D.T
+_PHASH_DCT = (2 * np.cos(np.pi / (2 * PHASH_IMAGE_SIZE)
+                         * np.outer(np.arange(PHASH_HASH_SIZE), 2 * np.arange(PHASH_IMAGE_SIZE) + 1))).astype(np.float32)
+
+def _phash_batch(thumbs):
+    """
+    Perceptual hashes of a stack of 32x32 grayscale thumbnails, packed into a (N,) uint64 array.
+    Same definition as imagehash.phash: the 8x8 lowest DCT frequencies
+    thresholded at their median, computed for the whole stack with two matmuls.
+    """
+    n = len(thumbs)
+    low = (_PHASH_DCT @ thumbs.astype(np.float32) @ _PHASH_DCT.T).reshape(n, PHASH_HASH_SIZE * PHASH_HASH_SIZE)
+    bits = low > np.median(low, axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view(np.uint64).reshape(n)
+
+def _hamming_distances(accepted_hashes, candidate):
+    """Hamming distance from `candidate` to every packed hash in `accepted_hashes`, in one vectorized pass."""
+    xor_bytes = (accepted_hashes ^ candidate).view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(xor_bytes, axis=1).sum(axis=1)
+
+def _frame_step(fps):
+    """Number of decoded frames per sampled frame at SCENE_SAMPLE_FPS."""
+    return max(1, int(fps // SCENE_SAMPLE_FPS)) if fps and fps > 0 else 1
+
+def _iter_video_frames(video_stream, video_name):
+    """
+    Yields frames of an in-memory video as RGB numpy arrays, sampled at SCENE_SAMPLE_FPS.
+    Uses PyAV to decode directly from the buffer (only I-frames if SCENE_KEYFRAMES_ONLY,
+    sampled by timestamp);
+    without it, falls back to a temporary file read by cv2.VideoCapture.
+    Skipped frames are decoded (to keep the codec state) but never converted.
+    """
+    if _PYAV_AVAILABLE:
+        with av.open(video_stream) as container:
+            stream = container.streams.video[0]
+            if SCENE_KEYFRAMES_ONLY:
+                # The decoder drops non-key frames itself. Key frames are irregularly spaced (and
+                # intra-only codecs make every frame one), so the rate is capped by pts, not by index
+                stream.codec_context.skip_frame = "NONKEY"
+                next_time = None
+                for frame in container.decode(stream):
+                    t = frame.time
+                    if t is not None:
+                        if next_time is not None and t < next_time:
+                            continue
+                        next_time = t + 1.0 / SCENE_SAMPLE_FPS
+                    yield frame.to_ndarray(format='rgb24') # PyAV emits RGB directly
+            else:
+                step = _frame_step(float(stream.average_rate or 0))
+                for i, frame in enumerate(container.decode(stream)):
+                    if i % step == 0:
+                        yield frame.to_ndarray(format='rgb24')
+        return
+
+    # Write stream to a unique temporary file for opencv to read (downloads run concurrently
+    # and Drive allows duplicate names, so the name can't be derived from video_name)
+    fd, temp_video_path = tempfile.mkstemp(prefix="planify_", suffix=os.path.splitext(video_name)[1])
+    cap = None
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(video_stream.read())
+        cap = cv2.VideoCapture(temp_video_path)
+        step = _frame_step(cap.get(cv2.CAP_PROP_FPS))
+        i = 0
+        while cap.isOpened():
+            # grab() advances without the BGR conversion; only sampled frames are retrieved
+            if not cap.grab():
+                break
+            if i % step == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                # Convert frame from BGR (OpenCV) to RGB
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            i += 1
+    finally:
+        if cap is not None:
+            cap.release()
+        # Clean up the temporary video file
+        if os.path.exists(temp_video_path):
+            os.remove(temp_video_path)
 
 def process_video_from_stream(video_stream, video_name):
     """
     Processes a video from an in-memory stream to extract keyframes.
-    Returns a list of tuples: (numpy_array, frame_name)
+    Yields tuples: (numpy_array, frame_name), so callers can check and drop
+    each keyframe before the next one is decoded.
     """
     print(f"-> Processing video: {video_name}")
-    keyframes = []
-    
-    # Write stream to a temporary file for moviepy/opencv to read
-    temp_video_path = f"temp_{video_name}"
-    with open(temp_video_path, 'wb') as f:
-        f.write(video_stream.read())
+    n_keyframes = 0
+    base_name = os.path.splitext(video_name)[0]
 
     try:
-        cap = cv2.VideoCapture(temp_video_path)
+        first_frame = None
         prev_frame = None
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for rgb_frame in _iter_video_frames(video_stream, video_name):
+            gray = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+            # Scene changes are visible at thumbnail size
+            gray = cv2.resize(gray, SCENE_DIFF_SIZE, interpolation=cv2.INTER_AREA)
             
-            if prev_frame is not None:
-                # Calculate the Mean Squared Error between consecutive frames
-                mse = np.mean((gray - prev_frame) ** 2)
+            if prev_frame is None:
+                first_frame = rgb_frame
+            else:
+                # Calculate the Mean Squared Error between consecutive sampled frames
+                # (cv2.norm accumulates the squared uint8 differences in double precision: no wraparound, no temporaries)
+                mse = cv2.norm(gray, prev_frame, cv2.NORM_L2SQR) / gray.size
                 
-                # If MSE exceeds threshold, it's a new scene, save the frame
+                # If MSE exceeds threshold, it's a new scene, emit the frame
                 if mse > SCENE_CHANGE_THRESHOLD:
-                    # Convert frame from BGR (OpenCV) to RGB (PIL/moviepy)
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    keyframes.append((rgb_frame, f"{os.path.splitext(video_name)[0]}_keyframe_{len(keyframes)+1}.jpg"))
+                    n_keyframes += 1
+                    first_frame = None # No longer needed as a fallback
+                    yield rgb_frame, f"{base_name}_keyframe_{n_keyframes}.jpg"
             
             prev_frame = gray
 
         # If no scenes were detected, just take the first frame
-        if not keyframes:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            ret, frame = cap.read()
-            if ret:
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                keyframes.append((rgb_frame, f"{os.path.splitext(video_name)[0]}_keyframe_1.jpg"))
-
-        cap.release()
-        print(f"   - Extracted {len(keyframes)} keyframes from video.")
+        if not n_keyframes and first_frame is not None:
+            n_keyframes = 1
+            yield first_frame, f"{base_name}_keyframe_1.jpg"
+
+        print(f"   - Extracted {n_keyframes} keyframes from video.")
     except Exception as e:
         print(f"   - Warning: Could not process video {video_name}. Error: {e}")
-    finally:
-        # Clean up the temporary video file
-        if os.path.exists(temp_video_path):
-            os.remove(temp_video_path)
-            
-    return keyframes
+
+def _download_file(service, file_id, size=None):
+    """Downloads a Drive file into an in-memory bytes buffer, positioned at the start."""
+    request = service.files().get_media(fileId=file_id)
+    if size is not None and int(size) <= SINGLE_SHOT_MAX_BYTES:
+        # One request and no chunk loop for the common case (photos, short clips)
+        return io.BytesIO(request.execute())
+
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+    
+    done = False
+    while not done:
+        _, done = downloader.next_chunk()
+    fh.seek(0) # Reset stream position to the beginning
+    return fh
+
+def _decode_image(fh, file_name):
+    """Decodes a downloaded image into an RGB numpy array, or returns None if it can't be read."""
+    try:
+        # Convert HEIC/HEIF in memory
+        if file_name.lower().endswith(('.heic', '.heif')):
+            heif_file = pillow_heif.read_heif(fh)
+            pil_image = Image.frombytes(
+                heif_file.mode, heif_file.size, heif_file.data, "raw"
+            ).convert("RGB")
+        else:
+            # libjpeg-turbo/libpng decode straight into a numpy array; PIL handles anything OpenCV can't
+            bgr = cv2.imdecode(np.frombuffer(fh.getbuffer(), dtype=np.uint8),
+                               cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION) # Match PIL: no EXIF rotation
+            if bgr is not None:
+                return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+            pil_image = Image.open(fh).convert("RGB")
+        
+        # Convert PIL image to OpenCV format (numpy array) for quality checks
+        return np.array(pil_image)
+
+    except Exception as e:
+        print(f"   - Warning: Could not process image {file_name}. Skipping. Error: {e}")
+        return None
+
+def _cache_path(item):
+    """Cache file for one Drive item; a new modifiedTime gives a new entry."""
+    mtime = re.sub(r'[^0-9A-Za-z]', '', item.get('modifiedTime', ''))
+    return os.path.join(CACHE_DIR, f"{item['id']}_{mtime}")
+
+def _load_cached_download(cache_path):
+    """Returns the cached file as an in-memory stream, or None (cache miss) if it can't be read."""
+    try:
+        with open(cache_path, 'rb') as f:
+            return io.BytesIO(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"   - Warning: Could not read cache entry {cache_path}, downloading instead. Error: {e}")
+        return None
+
+def _cache_download(fh, file_id, cache_path):
+    """
+    Stores the downloaded bytes at cache_path and removes the file's older entries.
+    Written to a temp name and renamed, so a partial entry is never read back.
+    Failures (e.g. a full disk) only skip caching.
+    """
+    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(fh.getbuffer())
+        os.replace(tmp_path, cache_path)
+        for entry in os.listdir(CACHE_DIR):
+            stale = os.path.join(CACHE_DIR, entry)
+            if entry.startswith(f"{file_id}_") and not entry.endswith(".tmp") and stale != cache_path:
+                os.remove(stale)
+    except Exception as e:
+        print(f"   - Warning: Could not cache {cache_path}. Error: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def _fetch_and_filter(item, creds):
+    """
+    Downloads one Drive item (or loads it from the local cache), decodes it and
+    runs the quality checks (runs in a worker thread).
+    Assets are checked as soon as they are decoded, so rejected images and
+    keyframes are released immediately instead of being held for a later pass.
+    Returns (n_raw, names, arrays, thumbs, stats, hashes): the number of decoded assets (one
+    for an image, one per keyframe for a video) and, column-wise, the names, arrays,
+    scorer thumbnails, technical stats and packed pHashes of those that passed.
+    """
+    file_id, file_name, mime_type = item['id'], item['name'], item['mimeType']
+    cache_path = _cache_path(item) if USE_CACHE else None
+    fh = _load_cached_download(cache_path) if cache_path else None
+    if fh is None:
+        try:
+            fh = _download_file(_get_thread_service(creds), file_id, item.get('size'))
+        except Exception as e:
+            print(f"   - Warning: Could not download {file_name}. Skipping. Error: {e}")
+            return 0, [], [], [], [], np.empty(0, dtype=np.uint64)
+        if cache_path:
+            _cache_download(fh, file_id, cache_path)
+
+    # Process based on file type
+    if 'video' in mime_type:
+        assets = process_video_from_stream(fh, file_name)
+    else: # Assumes image
+        image_array = _decode_image(fh, file_name)
+        assets = [] if image_array is None else [(image_array, file_name)]
+
+    n_raw, names, arrays, thumbs, stats, gray32s = 0, [], [], [], [], []
+    for asset_array, asset_name in assets:
+        n_raw += 1
+        ok, gray32, thumb, tech_stats = _check_quality(asset_array, asset_name)
+        if ok:
+            names.append(asset_name)
+            arrays.append(asset_array)
+            thumbs.append(thumb)
+            stats.append(tech_stats)
+            gray32s.append(gray32)
+    hashes = _phash_batch(np.stack(gray32s)) if gray32s else np.empty(0, dtype=np.uint64)
+    return n_raw, names, arrays, thumbs, stats, hashes
 
 # --- MAIN PIPELINE FUNCTION ---
 def run_ingestion_pipeline(drive_folder_url, max_files=50):
     """
     Main function to run the entire ingestion and pre-processing pipeline from Google Drive.
     Returns a list of high-quality, unique media as in-memory image objects.
-    Each object is a dictionary: {'name': str, 'array': numpy_array}
+    Each object is a dictionary: {'name': str, 'array': numpy_array, 'thumb': numpy_array, 'tech_stats': tuple},
+    where 'thumb' is a copy with the longest side <= THUMB_MAX_SIDE for scoring and 'tech_stats'
+    the (laplacian_variance, mean_intensity) of the full-resolution array.
+    """
+    return list(iter_ingestion(drive_folder_url, max_files))
+
+def iter_ingestion(drive_folder_url, max_files=50):
+    """
+    Streaming form of run_ingestion_pipeline: yields each high-quality, unique
+    media dictionary (see run_ingestion_pipeline) as soon as it has been
+    de-duplicated, while later files are still downloading, so callers can
+    start working on it immediately.
     """
     print("--- Starting Module 1: Intelligent Media Ingestion & Pre-processing ---")
     
     service = get_drive_service()
     if not service:
-        return []
+        return
 
-    try:
-        folder_id = drive_folder_url.split('/')[-1].split('?')[0]
-    except Exception:
+    # Matches .../folders/<id>, .../folders/<id>/edit, .../folders/<id>?usp=sharing, ...
+    match = re.search(r'/folders/([^/?#]+)', drive_folder_url)
+    folder_id = match.group(1) if match else drive_folder_url.split('/')[-1].split('?')[0]
+    if not folder_id:
         print("!!! ERROR: Invalid Google Drive folder URL.")
-        return []
+        return
 
     print(f"-> Accessing Google Drive folder: {folder_id}")
     
     # Query for all image and video files in the specified folder
     query = f"'{folder_id}' in parents and (mimeType contains 'image/' or mimeType contains 'video/')"
-    results = service.files().list(
-        q=query, pageSize=max_files, fields="files(id, name, mimeType)").execute()
-    items = results.get('files', [])
+    # Follow nextPageToken until max_files items are collected (Drive caps a page at 1000)
+    items = []
+    page_token = None
+    while len(items) < max_files:
+        results = service.files().list(
+            q=query, pageSize=min(max_files - len(items), 1000), pageToken=page_token,
+            fields="nextPageToken, files(id, name, mimeType, size, modifiedTime)").execute()
+        items.extend(results.get('files', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
 
     if not items:
         print("-> No media files found in the folder.")
-        return []
+        return
 
     print(f"-> Found {len(items)} media files. Starting processing...")
     
-    processed_media = []
-    
-    # 1. Download, convert, and extract keyframes
-    for item in items:
-        file_id, file_name, mime_type = item['id'], item['name'], item['mimeType']
-        
-        # Download the file into an in-memory bytes buffer
-        request = service.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        fh.seek(0) # Reset stream position to the beginning
-
-        # Process based on file type
-        if 'video' in mime_type:
-            keyframes = process_video_from_stream(fh, file_name)
-            for frame_array, frame_name in keyframes:
-                processed_media.append({'name': frame_name, 'array': frame_array})
-        else: # Assumes image
-            try:
-                # Convert HEIC/HEIF in memory
-                if file_name.lower().endswith(('.heic', '.heif')):
-                    heif_file = pillow_heif.read_heif(fh)
-                    pil_image = Image.frombytes(
-                        heif_file.mode, heif_file.size, heif_file.data, "raw"
-                    ).convert("RGB")
-                else:
-                    pil_image = Image.open(fh).convert("RGB")
+    # 1. Download, convert, extract keyframes, filter for quality (blur & exposure) and hash.
+    # Network-bound, so files are fetched concurrently
+    # 2. De-duplicate each file's survivors as soon as its result arrives, while
+    # later files are still downloading
+    creds = _load_credentials()
+    n_raw = n_quality = 0
+    names = []
+    # Accepted hashes live in one uint64 array (grown by doubling) so each candidate is
+    # compared against all of them with a single XOR + popcount
+    accepted_hashes = np.empty(max(1, len(items)), dtype=np.uint64)
+    executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+    try:
+        # map() yields in Drive listing order, which the de-duplication depends on
+        results = executor.map(lambda item: _fetch_and_filter(item, creds), items)
+        for file_raw, file_names, file_arrays, file_thumbs, file_stats, file_hashes in results:
+            n_raw += file_raw
+            n_quality += len(file_names)
+            for name, array, thumb, tech_stats, h in zip(file_names, file_arrays, file_thumbs, file_stats, file_hashes):
+                n_accepted = len(names)
+                if n_accepted:
+                    # Compare perceptual hash distance
+                    distances = _hamming_distances(accepted_hashes[:n_accepted], h)
+                    closest = int(np.argmin(distances))
+                    if distances[closest] <= SIMILARITY_THRESHOLD:
+                        print(f"   - DISCARDING {name}: Visually similar to {names[closest]}")
+                        continue
                 
-                # Convert PIL image to OpenCV format (numpy array) for quality checks
-                image_array = np.array(pil_image)
-                processed_media.append({'name': file_name, 'array': image_array})
-
-            except Exception as e:
-                print(f"   - Warning: Could not process image {file_name}. Skipping. Error: {e}")
-
-    print(f"\n-> Total raw media assets (images + keyframes): {len(processed_media)}")
-
-    # 2. Filter for quality (blur & exposure)
-    print("-> Starting quality filtering...")
-    quality_media = []
-    for media in processed_media:
-        if filter_media_by_quality(media['array'], media['name']):
-            quality_media.append(media)
-
-    print(f"-> Quality filtering complete. Kept {len(quality_media)} assets.")
-    
-    # 3. De-duplicate the quality-filtered images
-    print("-> Starting de-duplication...")
-    unique_hashes = {}
-    final_media_list = []
-    
-    for media in quality_media:
-        try:
-            # Convert numpy array back to PIL Image for hashing
-            pil_image = Image.fromarray(media['array'])
-            h = imagehash.phash(pil_image)
-            
-            found_similar = False
-            for existing_hash in unique_hashes.keys():
-                # Compare perceptual hash distance
-                if abs(h - existing_hash) <= SIMILARITY_THRESHOLD:
-                    found_similar = True
-                    print(f"   - DISCARDING {media['name']}: Visually similar to {unique_hashes[existing_hash]['name']}")
-                    break
-            
-            if not found_similar:
-                unique_hashes[h] = media
-                final_media_list.append(media)
-        except Exception as e:
-            print(f"   - Warning: Hashing failed for {media['name']}. Error: {e}")
+                if n_accepted == len(accepted_hashes):
+                    accepted_hashes = np.concatenate([accepted_hashes, np.empty_like(accepted_hashes)])
+                accepted_hashes[n_accepted] = h
+                names.append(name)
+                yield {'name': name, 'array': array, 'thumb': thumb, 'tech_stats': tech_stats}
+    finally:
+        # When the caller closes the stream early (GeneratorExit) or an error escapes, drop the
+        # queued downloads instead of waiting for all of them; in-flight ones finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    print(f"-> De-duplication complete. Kept {len(final_media_list)} unique assets.")
+    print(f"\n-> Total raw media assets (images + keyframes): {n_raw}")
+    print(f"-> Quality filtering complete. Kept {n_quality} assets.")
+    print(f"-> De-duplication complete. Kept {len(names)} unique assets.")
     
-    print(f"--- Pre-processing Complete. {len(final_media_list)} media assets are ready for scoring. ---")
-    return final_media_list
+    print(f"--- Pre-processing Complete. {len(names)} media assets are ready for scoring. ---")
 
 # --- EXAMPLE USAGE (for testing this file directly) ---
 if __name__ == "__main__":
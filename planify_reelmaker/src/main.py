@@ -1,12 +1,18 @@
 # src/main.py
 import os
 import shutil
+import tempfile
 import cv2
 import numpy as np
 import torch
 from torchvision import transforms
 from PIL import Image, ImageOps
+import hashlib
+import heapq
+import itertools
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Import your custom project modules ---
 from . import intelligent_ingestor
@@ -16,12 +22,14 @@ from . import image_scorer
 # --- Import your PyTorch model definition ---
 try:
     from .pytorch_nima_model import NimaEfficientNet  # adjust class name if different
+    from .pytorch_nima_model import OnnxNima, export_nima_onnx, ONNXRUNTIME_AVAILABLE
 except Exception as e:
     print("\n!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
     print("!!! ERROR: Could not find or import 'pytorch_nima_model.py' in the 'src/' folder.")
     print("!!! Please place your PyTorch NIMA model class definition there and ensure the class name matches.")
     print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!\n")
     NimaEfficientNet = None
+    ONNXRUNTIME_AVAILABLE = False
 
 # Optional HEIC support
 try:
@@ -31,14 +39,46 @@ try:
 except Exception:
     _HEIF_AVAILABLE = False
 
+# Optional libjpeg-turbo encoder (PyTurboJPEG) for the JPEGs written for the reel
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJPF_RGB
+    _TURBOJPEG = TurboJPEG()
+except Exception:
+    _TURBOJPEG = None
+
+TMPFS_DIR = "/dev/shm"
+
+def _make_temp_dir(min_free_bytes=500 * 1024 * 1024):
+    """
+    Creates a fresh temp image directory for this run: on tmpfs (/dev/shm) when it has
+    room, else in the OS temp dir. Unique per run, so concurrent runs never share (or
+    delete) each other's files. Only called when SAVE_TEMP_IMAGES actually writes temp images.
+    """
+    parent = None
+    try:
+        if os.path.isdir(TMPFS_DIR) and shutil.disk_usage(TMPFS_DIR).free >= min_free_bytes:
+            parent = TMPFS_DIR
+    except OSError:
+        pass
+    return tempfile.mkdtemp(prefix="planify_reel_", dir=parent)
+
 # --- CONFIGURATION ---
 #DRIVE_FOLDER_URL = "https://drive.google.com/drive/folders/1neAVyq2-TQkkNW5R_5WVjrr1WOjBy3UN?usp=sharing"
 DRIVE_FOLDER_URL = "https://drive.google.com/drive/folders/1lU-F433mn_9iGjm2TkBVTngynWlSDTrq?usp=sharing"
-TEMP_MEDIA_DIR = "temp_images/"
+TEMP_MEDIA_DIR = os.environ.get("PLANIFY_TMP") # None: a per-run _make_temp_dir() (RAM-backed when possible)
 OUTPUT_VIDEO_PATH = "output/final_reel.mp4"
 MUSIC_FILE_PATH = "assets/background_music.mp3"
 MAX_FILES_TO_PROCESS = 100
 IMAGES_FOR_REEL = 15
+PAD_WORKERS = min(8, os.cpu_count() or 1) # Top images are padded/encoded concurrently (OpenCV releases the GIL)
+SAVE_TEMP_IMAGES = False # Debug: write the padded images to TEMP_MEDIA_DIR and build the reel from disk
+REUSE_TEMP_IMAGES = False # Debug path: keep TEMP_MEDIA_DIR and reuse padded images (keyed by content hash) on re-runs; needs PLANIFY_TMP, never on tmpfs
+
+# Per-item failures (scoring batches, temp-image saves) print tracebacks only with PLANIFY_DEBUG=1,
+# and at most MAX_TRACEBACKS of them, so a bad folder can't flood stderr
+DEBUG_TRACEBACKS = int(os.environ.get("PLANIFY_DEBUG", "0"))
+MAX_TRACEBACKS = 3
+_TRACEBACK_COUNTER = itertools.count() # next() is atomic under the GIL, safe from the pad threads
 
 # Target video dimensions (vertical 9:16 reel)
 TARGET_W = 1080
@@ -52,10 +92,56 @@ W_ENG = 0.4
 # --- PATH TO YOUR TRAINED PYTORCH MODEL ---
 PYTORCH_NIMA_MODEL_PATH = "nima_efficientnet-b0_ava_4060.pth"
 
+# --- Optional ONNX Runtime (TensorRT/CUDA EP) inference for NIMA ---
+# Opt-in (PLANIFY_ONNX_NIMA=1, needs onnxruntime): it replaces the half-precision and
+# torch.compile paths below. The export is refreshed whenever the .pth changes.
+USE_ONNX_NIMA = os.getenv("PLANIFY_ONNX_NIMA", "0") == "1"
+NIMA_ONNX_PATH = os.path.splitext(PYTORCH_NIMA_MODEL_PATH)[0] + ".onnx"
+
+# --- Half precision for the PyTorch NIMA model on CUDA (BF16 where supported, else FP16) ---
+USE_HALF_PRECISION = True
+
+# --- torch.compile (TorchInductor + CUDA graphs) for the PyTorch NIMA model on CUDA ---
+USE_TORCH_COMPILE = True
+
+# --- NIMA batch size for scoring (None = size from free GPU memory / CPU default) ---
+SCORING_BATCH_SIZE = None
+
 # --- Device Selection (GPU if available, otherwise CPU) ---
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print(f"--- Using device: {DEVICE} ---")
 
+# NIMA always sees 224x224 inputs, so let cuDNN autotune its convolution algorithms once,
+# and allow TF32 for any matmuls left in FP32
+if DEVICE.type == "cuda":
+    torch.backends.cudnn.benchmark = True
+    torch.set_float32_matmul_precision("high")
+
+# =========================
+# Helper: rate-limited tracebacks
+# =========================
+def _debug_traceback():
+    """Prints the current exception's traceback if PLANIFY_DEBUG is set and MAX_TRACEBACKS isn't used up."""
+    if DEBUG_TRACEBACKS and next(_TRACEBACK_COUNTER) < MAX_TRACEBACKS:
+        traceback.print_exc()
+
+# =========================
+# Helper: JPEG encode
+# =========================
+def _encode_jpeg(image_array, path, quality=95, rgb=False):
+    """
+    Writes a BGR (or RGB with rgb=True) uint8 array as a JPEG: PyTurboJPEG when installed,
+    which takes either channel order as is, else cv2.imwrite. Returns True on success.
+    """
+    if _TURBOJPEG is not None:
+        with open(path, "wb") as f:
+            f.write(_TURBOJPEG.encode(np.ascontiguousarray(image_array), quality=quality,
+                                      pixel_format=TJPF_RGB if rgb else TJPF_BGR))
+        return True
+    if rgb:
+        image_array = np.ascontiguousarray(image_array[:, :, ::-1]) # RGB -> BGR channel swap, one copy
+    return cv2.imwrite(path, image_array, [cv2.IMWRITE_JPEG_QUALITY, quality])
+
 # =========================
 # Helper: safe image save
 # =========================
@@ -64,22 +150,25 @@ def safe_save_image_from_array(image_array, save_path):
     Save an image array (RGB uint8 numpy array) safely.
     - Try cv2.imwrite (expects BGR).
     - If that fails, fall back to Pillow and force .jpg if needed.
+    The destination directory must already exist (run_pipeline creates TEMP_MEDIA_DIR once).
     Returns the actual path written or None on failure.
     """
     try:
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
         arr = image_array
         if arr.dtype != np.uint8:
             arr = (np.clip(arr, 0, 1) * 255).astype(np.uint8) if arr.max() <= 1.0 else arr.astype(np.uint8)
 
         if arr.ndim == 3 and arr.shape[2] == 3:
-            bgr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+            bgr = np.ascontiguousarray(arr[:, :, ::-1]) # RGB -> BGR channel swap, one copy
         elif arr.ndim == 2:
             bgr = arr
         else:
             raise ValueError(f"Unsupported array shape: {arr.shape}")
 
-        ok = cv2.imwrite(save_path, bgr)
+        if bgr.ndim == 3 and save_path.lower().endswith((".jpg", ".jpeg")):
+            ok = _encode_jpeg(bgr, save_path)
+        else:
+            ok = cv2.imwrite(save_path, bgr)
         if ok:
             return save_path
 
@@ -98,20 +187,8 @@ def safe_save_image_from_array(image_array, save_path):
 # =========================
 # Helper: pad images to target (no cropping)
 # =========================
-def pad_image_to_target(input_path, output_path, target_w=TARGET_W, target_h=TARGET_H, fill_color=(0,0,0)):
-    """
-    Open image at input_path, pad it (with fill_color) to target_w x target_h
-    while preserving aspect ratio. Save to output_path (JPEG).
-    Returns output_path on success, None on failure.
-    """
-    try:
-        img = Image.open(input_path).convert("RGB")
-    except Exception as e:
-        print(f"   - Failed to open for padding: {input_path} ({e})")
-        return None
-
-    # Compute scaling to fit within target while preserving aspect
-    src_w, src_h = img.size
+def _fit_size(src_w, src_h, target_w, target_h):
+    """Returns (new_w, new_h, x_offset, y_offset) to fit src centered inside target (aspect preserved)."""
     src_ratio = src_w / src_h
     target_ratio = target_w / target_h
 
@@ -125,195 +202,467 @@ def pad_image_to_target(input_path, output_path, target_w=TARGET_W, target_h=TAR
         new_h = target_h
         new_w = round(target_h * src_ratio)
 
-    # Resize with high-quality resampling
-    img_resized = img.resize((new_w, new_h), resample=Image.LANCZOS)
+    return new_w, new_h, (target_w - new_w) // 2, (target_h - new_h) // 2
 
-    # Create new background and paste centered
-    background = Image.new("RGB", (target_w, target_h), fill_color)
-    x_offset = (target_w - new_w) // 2
-    y_offset = (target_h - new_h) // 2
-    background.paste(img_resized, (x_offset, y_offset))
+_CANVAS_LOCAL = threading.local() # One reusable canvas per pad worker thread
 
-    # Ensure output dir exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+def _thread_canvas(target_w, target_h):
+    """
+    Returns this thread's (target_h, target_w, 3) uint8 scratch canvas. Only for results that
+    are consumed (encoded) before the thread pads its next image.
+    """
+    canvas = getattr(_CANVAS_LOCAL, "canvas", None)
+    if canvas is None or canvas.shape != (target_h, target_w, 3):
+        canvas = _CANVAS_LOCAL.canvas = np.empty((target_h, target_w, 3), dtype=np.uint8)
+    return canvas
+
+def _pad_to_canvas(img, target_w, target_h, fill_color, out=None):
+    """
+    Returns img resized to fit target_w x target_h (aspect preserved) and padded
+    with fill_color, centered. Channel order is whatever img uses; fill_color must match it.
+    'out' is an optional preallocated (target_h, target_w, 3) uint8 canvas to draw into.
+    """
+    # Compute scaling to fit within target while preserving aspect
+    src_h, src_w = img.shape[:2]
+    new_w, new_h, x_offset, y_offset = _fit_size(src_w, src_h, target_w, target_h)
+
+    # Allocate the padded canvas once and resize (high-quality resampling) straight into
+    # its centered window: no separate resized image, no copy into the background
+    # INTER_AREA when shrinking (fast, alias-free), LANCZOS4 only when enlarging
+    padded = np.empty((target_h, target_w, 3), dtype=np.uint8) if out is None else out
+    padded[:] = fill_color
+    interpolation = cv2.INTER_AREA if new_w < src_w else cv2.INTER_LANCZOS4
+    cv2.resize(img, (new_w, new_h), dst=padded[y_offset:y_offset + new_h, x_offset:x_offset + new_w],
+               interpolation=interpolation)
+    return padded
+
+def _write_padded_jpeg(padded, output_path, rgb=False):
+    # The output dir is created once by run_pipeline, not per image
     try:
         # Save as JPEG to be safe for video encoding
-        background.save(output_path, format="JPEG", quality=95)
+        if not _encode_jpeg(padded, output_path, quality=95, rgb=rgb):
+            raise IOError("JPEG encode returned False")
         return output_path
     except Exception as e:
         print(f"   - Failed to save padded image {output_path}: {e}")
         return None
 
+def pad_image_to_target(input_path, output_path, target_w=TARGET_W, target_h=TARGET_H, fill_color=(0,0,0)):
+    """
+    Open image at input_path, pad it (with fill_color) to target_w x target_h
+    while preserving aspect ratio. Save to output_path (JPEG); its directory must exist.
+    Returns output_path on success, None on failure.
+    """
+    try:
+        img = cv2.imread(input_path, cv2.IMREAD_COLOR) # BGR
+        if img is None:
+            # Formats OpenCV can't read (e.g. HEIC) go through Pillow
+            img = cv2.cvtColor(np.asarray(Image.open(input_path).convert("RGB")), cv2.COLOR_RGB2BGR)
+    except Exception as e:
+        print(f"   - Failed to open for padding: {input_path} ({e})")
+        return None
+
+    # Encoded right away, so the thread's scratch canvas can be reused
+    padded = _pad_to_canvas(img, target_w, target_h, fill_color[::-1], # fill_color is RGB
+                            out=_thread_canvas(target_w, target_h))
+    return _write_padded_jpeg(padded, output_path)
+
+def pad_array_to_target(image_array, output_path, target_w=TARGET_W, target_h=TARGET_H, fill_color=(0,0,0)):
+    """
+    Same as pad_image_to_target, but from an in-memory RGB uint8 array:
+    the image is JPEG-encoded once, already padded, with no temp-file round trip.
+    Returns output_path on success, None on failure.
+    """
+    try:
+        # Pad in RGB; the encoder swaps channels only if it needs BGR (no cvtColor pass)
+        padded = _pad_to_canvas(image_array, target_w, target_h, fill_color,
+                                out=_thread_canvas(target_w, target_h))
+    except Exception as e:
+        print(f"   - Failed to pad image array for {output_path}: {e}")
+        return None
+    return _write_padded_jpeg(padded, output_path, rgb=True)
+
+# =========================
+# Helper: score one batch of ingested media
+# =========================
+def _score_media_batch(batch, scored_media, scores_out):
+    """
+    Scores 'batch' with one get_all_scores_batch call and appends the media and
+    their score dicts to 'scored_media' / 'scores_out'. A failed batch is skipped.
+    """
+    try:
+        batch_scores = image_scorer.get_all_scores_batch(
+            # Ingestion already produced scorer-sized thumbnails; full-res arrays are only kept for the reel.
+            # Their technical stats were measured on the full-res arrays during the quality check
+            [media.get('thumb', media['array']) for media in batch], MODELS, batch_size=MODELS["batch_size"],
+            tech_stats=[media.get('tech_stats') for media in batch]
+        )
+    except Exception as ex_score:
+        print(f"   - ERROR scoring batch ({len(batch)} media): {ex_score}")
+        _debug_traceback()
+        return
+    scored_media.extend(batch)
+    scores_out.extend(batch_scores)
+
+# =========================
+# Helper: prepare one top image for the reel
+# =========================
+def _prepare_for_reel(media):
+    """
+    Pads one selected media item to the reel size and saves it in TEMP_MEDIA_DIR.
+    Returns (path, status) with status "padded", "unpadded" (padding failed, the
+    original image was saved instead) or "skipped" (path is None).
+    Padded files are named after a hash of the source pixels and the target size, so
+    with REUSE_TEMP_IMAGES a re-run with the same selection skips the pad + encode.
+    """
+    try:
+        safe_filename = media['name'].replace(" ", "_")
+
+        if isinstance(media.get('array'), np.ndarray) and media['array'].ndim == 3 and media['array'].shape[2] == 3:
+            # blake2b over the raw pixels is cheap next to the LANCZOS resize it can skip.
+            # Shape and dtype go in first: the same bytes viewed as another size are another image
+            pixels = np.ascontiguousarray(media['array'])
+            hasher = hashlib.blake2b(digest_size=8)
+            hasher.update(str((pixels.shape, pixels.dtype.str)).encode())
+            hasher.update(pixels.data)
+            key = hasher.hexdigest()
+            padded_path = os.path.join(TEMP_MEDIA_DIR, f"padded_{key}_{TARGET_W}x{TARGET_H}.jpg")
+            if REUSE_TEMP_IMAGES and os.path.exists(padded_path):
+                return padded_path, "padded"
+
+            out = pad_array_to_target(media['array'], padded_path, target_w=TARGET_W, target_h=TARGET_H)
+            if out:
+                return out, "padded"
+
+            # Padding failed: save the unpadded image instead
+            orig_ext = os.path.splitext(media['name'])[1] or ".jpg"
+            save_path = os.path.join(TEMP_MEDIA_DIR, f"{safe_filename}{orig_ext}")
+            written_path = safe_save_image_from_array(media['array'], save_path)
+            if written_path:
+                print(f"   - Warning: Padding failed for {media['name']}, using original image.")
+                return written_path, "unpadded"
+            print(f"   - Warning: Failed to save media '{media['name']}' (skipping).")
+        else:
+            print(f"   - Warning: Skipping invalid image array shape for {media.get('name','unknown')}: {type(media.get('array'))}/{getattr(media.get('array'), 'shape', None)}")
+
+    except Exception as e_save:
+        print(f"   - Warning: Could not save temporary file for {media.get('name','unknown')}. Skipping. Error: {e_save}")
+        _debug_traceback()
+    return None, "skipped"
+
+# =========================
+# Helper: pad one top image in memory
+# =========================
+def _pad_frame_for_reel(media):
+    """
+    Returns the media's image padded to TARGET_W x TARGET_H as an RGB uint8 array
+    (ready to hand to the video generator), or None if it can't be used.
+    """
+    image_array = media.get('array')
+    if not (isinstance(image_array, np.ndarray) and image_array.ndim == 3 and image_array.shape[2] == 3):
+        print(f"   - Warning: Skipping invalid image array shape for {media.get('name','unknown')}: {type(image_array)}/{getattr(image_array, 'shape', None)}")
+        return None
+    try:
+        return _pad_to_canvas(image_array, TARGET_W, TARGET_H, (0, 0, 0))
+    except Exception as e_pad:
+        print(f"   - Warning: Could not pad {media.get('name','unknown')}. Skipping. Error: {e_pad}")
+        _debug_traceback()
+        return None
+
+def pad_frames_on_gpu(arrays, target_w=TARGET_W, target_h=TARGET_H):
+    """
+    CUDA version of _pad_frame_for_reel for a whole list of RGB uint8 arrays: each image
+    is uploaded, resized (antialiased bicubic) into its window of one (N,3,H,W) black
+    canvas on DEVICE, and the canvas is copied back once. Returns a list of HxWx3 arrays.
+    """
+    canvas = torch.zeros((len(arrays), 3, target_h, target_w), dtype=torch.uint8, device=DEVICE)
+    for i, arr in enumerate(arrays):
+        src_h, src_w = arr.shape[:2]
+        new_w, new_h, x_offset, y_offset = _fit_size(src_w, src_h, target_w, target_h)
+        src = torch.from_numpy(np.ascontiguousarray(arr)).to(DEVICE, non_blocking=True)
+        src = src.permute(2, 0, 1).unsqueeze(0).float()
+        resized = torch.nn.functional.interpolate(src, size=(new_h, new_w), mode="bicubic",
+                                                  align_corners=False, antialias=True)
+        canvas[i, :, y_offset:y_offset + new_h, x_offset:x_offset + new_w] = resized[0].round_().clamp_(0, 255).to(torch.uint8)
+    frames = canvas.permute(0, 2, 3, 1).cpu().numpy()
+    return list(frames)
+
 # =========================
 # Load models
 # =========================
-print("--- Initializing AI Models (this may take a moment) ---")
 NIMA_MODEL_PT = None
 YOLO_MODEL = None
 EMOTION_MODEL = None
 MODELS = None
 
-try:
-    # 1) Load NIMA PyTorch model if class exists and path exists
-    if NimaEfficientNet is not None and os.path.exists(PYTORCH_NIMA_MODEL_PATH):
-        try:
-            NIMA_MODEL_PT = NimaEfficientNet()  # instantiate (adjust if constructor differs)
-            state_dict = torch.load(PYTORCH_NIMA_MODEL_PATH, map_location=DEVICE)
-
-            # handle DataParallel 'module.' keys
-            if isinstance(state_dict, dict) and any(k.startswith("module.") for k in list(state_dict.keys())):
-                print("   - Removing 'module.' prefix from state_dict keys (trained with DataParallel).")
-                state_dict = {k.replace("module.", ""): v for k, v in state_dict.items()}
-
-            NIMA_MODEL_PT.load_state_dict(state_dict)
-            NIMA_MODEL_PT.to(DEVICE)
-            NIMA_MODEL_PT.eval()
-            print(f"   - Local PyTorch Aesthetic Model (NIMA) loaded successfully from '{PYTORCH_NIMA_MODEL_PATH}'.")
-        except Exception as ex_load:
-            print(f"!!! WARNING: Failed to load PyTorch NIMA model: {ex_load}")
-            traceback.print_exc()
-            NIMA_MODEL_PT = None
+def load_models():
+    """
+    Loads every scoring model into the module globals and sets MODELS (None on fatal error).
+    Called by run_pipeline on a worker thread, so the loading overlaps the Drive downloads;
+    compile_models then runs on the scoring thread.
+    """
+    global NIMA_MODEL_PT, YOLO_MODEL, EMOTION_MODEL, MODELS
+    print("--- Initializing AI Models (this may take a moment) ---")
+    try:
+        # Decided once and stored in MODELS: the warm-up shape, run_pipeline's chunks and the
+        # scorer's padding must agree, and default_batch_size() changes with free memory
+        scoring_batch_size = SCORING_BATCH_SIZE or image_scorer.default_batch_size(DEVICE)
+
+        # 1) Load NIMA PyTorch model if class exists and path exists
+        if NimaEfficientNet is not None and os.path.exists(PYTORCH_NIMA_MODEL_PATH):
+            try:
+                NIMA_MODEL_PT = NimaEfficientNet()  # instantiate (adjust if constructor differs)
+                try:
+                    # Memory-map the checkpoint (no eager read, no pickled objects) and adopt its
+                    # CPU tensors as the parameters instead of copying them (torch>=2.1)
+                    state_dict = torch.load(PYTORCH_NIMA_MODEL_PATH, map_location="cpu", mmap=True, weights_only=True)
+                    assign = True
+                except Exception as ex_mmap:
+                    # Older torch or legacy (non-zip) checkpoint
+                    print(f"   - Note: mmap checkpoint load unavailable, reading it eagerly. ({ex_mmap})")
+                    state_dict = torch.load(PYTORCH_NIMA_MODEL_PATH, map_location="cpu")
+                    assign = False
+
+                # handle DataParallel 'module.' keys
+                if isinstance(state_dict, dict) and any(k.startswith("module.") for k in state_dict):
+                    print("   - Removing 'module.' prefix from state_dict keys (trained with DataParallel).")
+                    state_dict = {k[7:] if k.startswith("module.") else k: v for k, v in state_dict.items()}
+
+                if assign:
+                    NIMA_MODEL_PT.load_state_dict(state_dict, strict=True, assign=True)
+                else:
+                    NIMA_MODEL_PT.load_state_dict(state_dict)
+                NIMA_MODEL_PT.to(DEVICE)
+                NIMA_MODEL_PT.eval()
+                print(f"   - Local PyTorch Aesthetic Model (NIMA) loaded successfully from '{PYTORCH_NIMA_MODEL_PATH}'.")
+            except Exception as ex_load:
+                print(f"!!! WARNING: Failed to load PyTorch NIMA model: {ex_load}")
+                traceback.print_exc()
+                NIMA_MODEL_PT = None
+
+            # Swap in an ONNX Runtime session (TensorRT -> CUDA -> CPU providers) when available
+            if NIMA_MODEL_PT is not None and USE_ONNX_NIMA and ONNXRUNTIME_AVAILABLE:
+                try:
+                    if (not os.path.exists(NIMA_ONNX_PATH)
+                            or os.path.getmtime(NIMA_ONNX_PATH) < os.path.getmtime(PYTORCH_NIMA_MODEL_PATH)):
+                        export_nima_onnx(NIMA_MODEL_PT, NIMA_ONNX_PATH, device=DEVICE)
+                    NIMA_MODEL_PT = OnnxNima(NIMA_ONNX_PATH, device=DEVICE,
+                                             batch_size=scoring_batch_size)
+                    print(f"   - NIMA will run through ONNX Runtime ('{NIMA_ONNX_PATH}').")
+                except Exception as ex_onnx:
+                    print(f"   - Warning: ONNX Runtime NIMA unavailable, keeping PyTorch model. Error: {ex_onnx}")
+
+            # Half precision on GPU only (FP16 on CPU is slower); scores are accumulated in FP32
+            if isinstance(NIMA_MODEL_PT, torch.nn.Module) and USE_HALF_PRECISION and DEVICE.type == "cuda":
+                half_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                NIMA_MODEL_PT = NIMA_MODEL_PT.to(half_dtype).eval()
+                print(f"   - NIMA converted to {half_dtype} for GPU inference.")
+
+        elif NimaEfficientNet is None:
+            print("!!! WARNING: PyTorch NIMA model definition not found. Cannot load NIMA model.")
+        else:
+            print(f"!!! WARNING: Local PyTorch NIMA model file not found at '{PYTORCH_NIMA_MODEL_PATH}'. Using defaults.")
 
-    elif NimaEfficientNet is None:
-        print("!!! WARNING: PyTorch NIMA model definition not found. Cannot load NIMA model.")
-    else:
-        print(f"!!! WARNING: Local PyTorch NIMA model file not found at '{PYTORCH_NIMA_MODEL_PATH}'. Using defaults.")
+        # 2) Semantic model placeholder (YOLO)
+        YOLO_MODEL = None  # TODO: load your YOLO model here
+        print("   - Semantic Model (YOLO) placeholder created.")
 
-    # 2) Semantic model placeholder (YOLO)
-    YOLO_MODEL = None  # TODO: load your YOLO model here
-    print("   - Semantic Model (YOLO) placeholder created.")
+        # 3) Emotion model placeholder
+        EMOTION_MODEL = None  # TODO: load emotion model here
+        print("   - Emotion Model placeholder created.")
 
-    # 3) Emotion model placeholder
-    EMOTION_MODEL = None  # TODO: load emotion model here
-    print("   - Emotion Model placeholder created.")
+        MODELS = {
+            "nima_pt": NIMA_MODEL_PT,
+            "yolo": YOLO_MODEL,
+            "emotion": EMOTION_MODEL,
+            "device": DEVICE,
+            "batch_size": scoring_batch_size
+        }
+        print("--- Model Initialization Complete ---")
 
-    MODELS = {
-        "nima_pt": NIMA_MODEL_PT,
-        "yolo": YOLO_MODEL,
-        "emotion": EMOTION_MODEL,
-        "device": DEVICE
-    }
-    print("--- Model Initialization Complete ---")
+    except Exception as e:
+        print(f"!!! FATAL ERROR during model initialization: {e}")
+        traceback.print_exc()
+        MODELS = None
+    return MODELS
 
-except Exception as e:
-    print(f"!!! FATAL ERROR during model initialization: {e}")
-    traceback.print_exc()
-    MODELS = None
+def compile_models():
+    """
+    torch.compile + CUDA-graph warm-up for NIMA (CUDA only). Must run on the thread that
+    calls the model: inductor's cudagraph trees keep their state in thread-local storage.
+    """
+    global NIMA_MODEL_PT
+    # Compile once for the fixed 224x224 input; may fail on older GPUs/torch, so keep eager as fallback
+    if (isinstance(NIMA_MODEL_PT, torch.nn.Module) and not hasattr(NIMA_MODEL_PT, "_orig_mod")
+            and USE_TORCH_COMPILE and DEVICE.type == "cuda" and hasattr(torch, "compile")):
+        try:
+            NIMA_MODEL_PT.base.set_swish(memory_efficient=False) # Plain Swish traces cleanly
+            try:
+                # Reuse compiled kernels from earlier runs (on-disk FX graph cache, torch>=2.1)
+                import torch._inductor.config as inductor_config
+                inductor_config.fx_graph_cache = True
+            except Exception:
+                pass
+            # Batches are padded to one fixed shape, so static shapes give the best fused kernels
+            compiled_nima = torch.compile(NIMA_MODEL_PT, mode="reduce-overhead", fullgraph=True, dynamic=False)
+            # Warm up with the expected batch shape so the graph is captured before the first real call
+            warmup_dtype = next(NIMA_MODEL_PT.parameters()).dtype
+            warmup_batch = torch.zeros(MODELS["batch_size"], 3, 224, 224, device=DEVICE, dtype=warmup_dtype)
+            with torch.inference_mode():
+                compiled_nima(warmup_batch)
+            NIMA_MODEL_PT = MODELS["nima_pt"] = compiled_nima
+            print("   - NIMA compiled with torch.compile (mode='reduce-overhead').")
+        except Exception as ex_compile:
+            print(f"   - Warning: torch.compile failed for NIMA, using eager mode. Error: {ex_compile}")
 
 # =========================
 # Run pipeline
 # =========================
-def run_pipeline():
-    if MODELS is None:
+def _wait_for_models(models_future):
+    """
+    Blocks until load_models has finished, then compiles NIMA on this (the scoring) thread.
+    Returns False if the models failed to initialize.
+    """
+    if models_future.result() is None:
         print("!!! Aborting pipeline because AI models failed to initialize.")
-        return
+        return False
+    compile_models()
+    if MODELS.get("nima_pt") is None:
+        print("   - Warning: PyTorch NIMA model not available. Engagement scores will use defaults/placeholders.")
+    return True
 
+def run_pipeline():
+    global TEMP_MEDIA_DIR
     if DRIVE_FOLDER_URL == "YOUR_GOOGLE_DRIVE_FOLDER_URL_HERE":
         print("!!! ERROR: Please update the DRIVE_FOLDER_URL in main.py before running.")
         return
 
     print("\n--- Starting Planify Reel Maker Pipeline ---")
 
-    # MODULE 1: Ingestion
-    clean_media_objects = intelligent_ingestor.run_ingestion_pipeline(
-        drive_folder_url=DRIVE_FOLDER_URL,
-        max_files=MAX_FILES_TO_PROCESS
-    )
-
-    if not clean_media_objects:
+    # MODULE 1 + 2: Ingestion streamed into Scoring. Media are scored a batch at a time
+    # as they come out of ingestion, while later files are still downloading
+    # Models load on a worker thread (disk + CUDA init) while the Drive listing and the first
+    # downloads run (network bound); the main thread waits for them once the first media
+    # arrives, while the remaining downloads carry on in the ingestion pool.
+    # Threads, not processes, so the weights land in this process's CUDA context.
+    with ThreadPoolExecutor(max_workers=1) as loader:
+        models_future = loader.submit(load_models) if MODELS is None else None
+        if models_future is None:
+            compile_models() # No-op once compiled
+
+        print("\n-> Scoring high-quality media assets as they are ingested...")
+        clean_media_objects = []
+        all_scores = []
+        pending = []
+        n_ingested = 0
+        media_stream = intelligent_ingestor.iter_ingestion(
+            drive_folder_url=DRIVE_FOLDER_URL,
+            max_files=MAX_FILES_TO_PROCESS
+        )
+        for media in media_stream:
+            if models_future is not None:
+                # The chunk size is the batch size load_models settled on
+                if not _wait_for_models(models_future):
+                    media_stream.close() # Cancels the downloads that have not started yet
+                    return
+                models_future = None
+            n_ingested += 1
+            pending.append(media)
+            if len(pending) == MODELS["batch_size"]:
+                _score_media_batch(pending, clean_media_objects, all_scores)
+                pending = []
+        if models_future is not None and not _wait_for_models(models_future):
+            return
+        if pending:
+            _score_media_batch(pending, clean_media_objects, all_scores)
+
+    if not n_ingested:
         print("Pipeline stopped: No media passed the pre-processing stage.")
         return
 
-    # MODULE 2: Scoring
-    print(f"\n-> Scoring {len(clean_media_objects)} high-quality media assets...")
-    scored_media_data = []
-    nima_ready = MODELS.get("nima_pt") is not None
-    if not nima_ready:
-        print("   - Warning: PyTorch NIMA model not available. Engagement scores will use defaults/placeholders.")
+    if not all_scores:
+        print("Pipeline stopped: Could not score any images.")
+        return
 
-    for media in clean_media_objects:
-        try:
-            scores = image_scorer.get_all_scores(media['array'], MODELS)
-        except Exception as ex_score:
-            print(f"   - ERROR scoring {media.get('name', 'unknown')}: {ex_score}")
-            traceback.print_exc()
-            continue
+    # Final scores for all media at once: (N, 3) score matrix @ weights
+    score_matrix = np.array(
+        [(scores.get('technical_score', 0.0), scores.get('semantic_score', 0.0), scores.get('engagement_score', 0.0))
+         for scores in all_scores],
+        dtype=np.float64
+    )
+    final_scores = score_matrix @ np.array([W_TECH, W_SEM, W_ENG])
 
-        final_score = (W_TECH * scores.get('technical_score', 0.0)) + \
-                      (W_SEM  * scores.get('semantic_score', 0.0)) + \
-                      (W_ENG  * scores.get('engagement_score', 0.0))
+    for media, (tech, sem, eng), final_score in zip(clean_media_objects, score_matrix, final_scores):
+        print(f"   - Scored {media['name']}: Tech({tech:.2f}), "
+              f"Sem({sem:.2f}), Eng({eng:.2f}) -> FINAL: {final_score:.2f}")
 
-        scored_media_data.append((media, final_score))
-        print(f"   - Scored {media['name']}: Tech({scores.get('technical_score',0):.2f}), "
-              f"Sem({scores.get('semantic_score',0):.2f}), Eng({scores.get('engagement_score',0):.2f}) -> FINAL: {final_score:.2f}")
+    # Select top K in O(N log K); nlargest matches a stable descending sort, so ties keep ingestion order
+    print(f"\n-> Selecting the top {IMAGES_FOR_REEL} media assets for the reel.")
+    top_idx = heapq.nlargest(IMAGES_FOR_REEL, range(len(final_scores)), key=final_scores.__getitem__)
+    top_media_objects = [clean_media_objects[i] for i in top_idx]
+
+    # MODULE 3 + 4: Pad the top images in memory and create the reel video from them
+    # (no temp JPEG encode/decode round trip). SAVE_TEMP_IMAGES keeps the old disk path for debugging.
+    if not SAVE_TEMP_IMAGES:
+        print(f"\n-> Preparing top {len(top_media_objects)} assets for video generation...")
+        padded_frames = None
+        if DEVICE.type == "cuda":
+            # CUDA is already up for NIMA: resize + pad all top images there in one batch
+            valid = [m['array'] for m in top_media_objects
+                     if isinstance(m.get('array'), np.ndarray) and m['array'].ndim == 3 and m['array'].shape[2] == 3]
+            try:
+                padded_frames = pad_frames_on_gpu(valid) if valid else []
+            except Exception as e_gpu:
+                print(f"   - Warning: GPU padding failed, falling back to CPU. Error: {e_gpu}")
+                _debug_traceback()
+                padded_frames = None
+        if padded_frames is None:
+            with ThreadPoolExecutor(max_workers=PAD_WORKERS) as executor:
+                # map() keeps the ranking order of the top images
+                padded_frames = [f for f in executor.map(_pad_frame_for_reel, top_media_objects) if f is not None]
+
+        if not padded_frames:
+            print("!!! ERROR: No valid media could be prepared for video generation.")
+            return
+
+        print(f"   - Padded {len(padded_frames)} images in memory. Skipped {len(top_media_objects) - len(padded_frames)}.")
 
-    if not scored_media_data:
-        print("Pipeline stopped: Could not score any images.")
-        return
+        try:
+            video_generator.create_reel_from_arrays(
+                frames=padded_frames,
+                music_path=MUSIC_FILE_PATH,
+                output_path=OUTPUT_VIDEO_PATH
+            )
+        except Exception as e_vid:
+            print(f"!!! ERROR while generating video: {e_vid}")
+            traceback.print_exc()
 
-    # Sort and select top
-    scored_media_data.sort(key=lambda item: item[1], reverse=True)
-    print(f"\n-> Selecting the top {IMAGES_FOR_REEL} media assets for the reel.")
-    top_media_objects = [item[0] for item in scored_media_data[:IMAGES_FOR_REEL]]
+        print(f"\n--- Pipeline Finished Successfully. AI-curated reel saved at: {OUTPUT_VIDEO_PATH} ---")
+        return
 
-    # MODULE 3: Save temp images for video gen
+    # MODULE 3: Pad the top images (from memory) and save them for video gen
     print(f"\n-> Preparing top {len(top_media_objects)} assets for video generation...")
-    if not os.path.exists(TEMP_MEDIA_DIR):
-        os.makedirs(TEMP_MEDIA_DIR, exist_ok=True)
+    own_temp_dir = TEMP_MEDIA_DIR is None
+    if own_temp_dir:
+        TEMP_MEDIA_DIR = _make_temp_dir()
+    os.makedirs(TEMP_MEDIA_DIR, exist_ok=True) # Once for all images
 
-    top_image_paths = []
-    converted_count = 0
-    skipped_count = 0
+    with ThreadPoolExecutor(max_workers=PAD_WORKERS) as executor:
+        # map() keeps the ranking order of the top images
+        prepared = list(executor.map(_prepare_for_reel, top_media_objects))
 
-    for media in top_media_objects:
-        try:
-            safe_filename = media['name'].replace(" ", "_")
-            orig_ext = os.path.splitext(media['name'])[1] or ".jpg"
-            save_name = f"{safe_filename}{orig_ext}"
-            save_path = os.path.join(TEMP_MEDIA_DIR, save_name)
-
-            if isinstance(media.get('array'), np.ndarray) and media['array'].ndim == 3 and media['array'].shape[2] == 3:
-                written_path = safe_save_image_from_array(media['array'], save_path)
-                if written_path:
-                    top_image_paths.append(written_path)
-                    if written_path.lower().endswith(".jpg") and not save_name.lower().endswith(".jpg"):
-                        converted_count += 1
-                else:
-                    skipped_count += 1
-                    print(f"   - Warning: Failed to save media '{media['name']}' (skipping).")
-            else:
-                skipped_count += 1
-                print(f"   - Warning: Skipping invalid image array shape for {media.get('name','unknown')}: {type(media.get('array'))}/{getattr(media.get('array'), 'shape', None)}")
-
-        except Exception as e_save:
-            skipped_count += 1
-            print(f"   - Warning: Could not save temporary file for {media.get('name','unknown')}. Skipping. Error: {e_save}")
-            traceback.print_exc()
+    padded_image_paths = [path for path, _ in prepared if path]
+    unpadded_count = sum(1 for _, status in prepared if status == "unpadded")
+    skipped_count = sum(1 for _, status in prepared if status == "skipped")
 
-    if not top_image_paths:
+    if not padded_image_paths:
         print("!!! ERROR: No valid media files could be saved for video generation.")
+        if own_temp_dir:
+            shutil.rmtree(TEMP_MEDIA_DIR, ignore_errors=True)
+            TEMP_MEDIA_DIR = None
         return
 
-    print(f"   - Saved {len(top_image_paths)} images to temporary directory. Converted {converted_count}, skipped {skipped_count}.")
-
-    # ---------------------------
-    # PAD images to target (no crop) BEFORE video generation
-    # ---------------------------
-    padded_image_paths = []
-    for p in top_image_paths:
-        try:
-            base = os.path.basename(p)
-            padded_name = f"padded_{os.path.splitext(base)[0]}.jpg"
-            padded_path = os.path.join(TEMP_MEDIA_DIR, padded_name)
-            out = pad_image_to_target(p, padded_path, target_w=TARGET_W, target_h=TARGET_H)
-            if out:
-                padded_image_paths.append(out)
-            else:
-                print(f"   - Warning: Padding failed for {p}, using original path.")
-                padded_image_paths.append(p)
-        except Exception as e_pad:
-            print(f"   - Warning: Exception while padding {p}: {e_pad}")
-            padded_image_paths.append(p)
+    print(f"   - Saved {len(padded_image_paths)} images to temporary directory. Unpadded {unpadded_count}, skipped {skipped_count}.")
 
     # MODULE 4: Create reel video
     try:
@@ -326,13 +675,19 @@ def run_pipeline():
         print(f"!!! ERROR while generating video: {e_vid}")
         traceback.print_exc()
 
-    # CLEANUP temporary files
-    if os.path.exists(TEMP_MEDIA_DIR):
+    # CLEANUP temporary files. A per-run directory is always removed (nothing could reuse it);
+    # a PLANIFY_TMP directory is kept for the next run only with REUSE_TEMP_IMAGES on a real disk
+    # (leftovers on tmpfs would hold RAM across runs)
+    keep_temp = (not own_temp_dir and REUSE_TEMP_IMAGES
+                 and not os.path.abspath(TEMP_MEDIA_DIR).startswith(TMPFS_DIR))
+    if not keep_temp and os.path.exists(TEMP_MEDIA_DIR):
         try:
             shutil.rmtree(TEMP_MEDIA_DIR)
             print(f"\n-> Cleaned up temporary directory: {TEMP_MEDIA_DIR}")
         except Exception as e_rm:
             print(f"\n-> Warning: Could not remove temporary directory {TEMP_MEDIA_DIR}. Error: {e_rm}")
+    if own_temp_dir:
+        TEMP_MEDIA_DIR = None # The next run_pipeline() call gets its own directory
 
     print(f"\n--- Pipeline Finished Successfully. AI-curated reel saved at: {OUTPUT_VIDEO_PATH} ---")
 
@@ -1,9 +1,21 @@
 # src/pytorch_nima_model.py
 
+import os
+import numpy as np
 import torch
 import torch.nn as nn
 from efficientnet_pytorch import EfficientNet
 
+# Optional ONNX Runtime support (TensorRT / CUDA / CPU execution providers)
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except Exception:
+    ONNXRUNTIME_AVAILABLE = False
+
+# Preferred execution providers, fastest first
+_ORT_PROVIDERS = ["TensorrtExecutionProvider", "CUDAExecutionProvider", "CPUExecutionProvider"]
+
 
 class NimaEfficientNet(nn.Module):
     """
@@ -57,3 +69,82 @@ class NimaEfficientNet(nn.Module):
             print(f"✅ Loaded weights from {checkpoint_path}")
         except Exception as e:
             print(f"⚠️  Failed to load checkpoint: {e}")
+
+
+def export_nima_onnx(model, onnx_path, device="cpu", opset=17):
+    """
+    Exports a NimaEfficientNet to ONNX with a dynamic batch dimension.
+    """
+    # The memory-efficient Swish is a custom autograd Function that ONNX cannot trace
+    model.base.set_swish(memory_efficient=False)
+    model.eval()
+    dummy = torch.zeros(1, 3, 224, 224, device=device)
+    torch.onnx.export(
+        model, dummy, onnx_path,
+        opset_version=opset,
+        input_names=["input"],
+        output_names=["scores"],
+        dynamic_axes={"input": {0: "batch"}, "scores": {0: "batch"}},
+    )
+    print(f"✅ Exported NIMA to ONNX at {onnx_path}")
+
+
+class OnnxNima:
+    """
+    Callable wrapper around an ONNX Runtime session for an exported NIMA model.
+    Takes and returns torch tensors like the PyTorch module, so it is a drop-in
+    replacement for `nima_model_pt(batch_tensor)`.
+    On CUDA, inputs and outputs are bound to device memory (no host round-trip) and
+    ORT runs on torch's current stream. With 'batch_size', the TensorRT engine is built
+    (and cached on disk, FP16) for that one batch shape only; callers must then pad
+    every batch to 'fixed_batch_size'.
+    """
+
+    def __init__(self, onnx_path, device="cpu", batch_size=None):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise RuntimeError("onnxruntime is not installed")
+        self.device = torch.device(device)
+        self.fixed_batch_size = None
+        self.stream = None
+        available = ort.get_available_providers()
+        if self.device.type == "cuda":
+            # Share torch's stream so inputs written by torch need no device-wide sync
+            self.stream = torch.cuda.current_stream(self.device)
+            stream_opts = {"has_user_compute_stream": "1", "user_compute_stream": str(self.stream.cuda_stream)}
+            trt_opts = dict(stream_opts,
+                            trt_fp16_enable="1",
+                            trt_engine_cache_enable="1",
+                            trt_engine_cache_path=os.path.dirname(os.path.abspath(onnx_path)))
+            if batch_size:
+                # One optimization profile: the engine is never rebuilt for a new batch size
+                shape = f"input:{batch_size}x3x224x224"
+                trt_opts.update(trt_profile_min_shapes=shape, trt_profile_opt_shapes=shape,
+                                trt_profile_max_shapes=shape)
+                self.fixed_batch_size = batch_size
+            options = {"TensorrtExecutionProvider": trt_opts, "CUDAExecutionProvider": stream_opts}
+            providers = [(p, options[p]) if p in options else p for p in _ORT_PROVIDERS if p in available]
+        else:
+            providers = ["CPUExecutionProvider"]
+        self.session = ort.InferenceSession(onnx_path, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+        self.num_classes = self.session.get_outputs()[0].shape[1]
+        print(f"✅ ONNX Runtime NIMA session ready ({self.session.get_providers()[0]})")
+
+    def __call__(self, x):
+        x = x.float().contiguous()
+        if x.device.type != "cuda":
+            out = self.session.run([self.output_name], {self.input_name: x.cpu().numpy()})[0]
+            return torch.from_numpy(out)
+
+        if torch.cuda.current_stream(x.device) != self.stream:
+            # ORT is bound to another stream: make sure torch has finished writing 'x'
+            torch.cuda.current_stream(x.device).synchronize()
+        out = torch.empty((x.shape[0], self.num_classes), dtype=torch.float32, device=x.device)
+        binding = self.session.io_binding()
+        binding.bind_input(self.input_name, "cuda", x.device.index or 0, np.float32,
+                           tuple(x.shape), x.data_ptr())
+        binding.bind_output(self.output_name, "cuda", out.device.index or 0, np.float32,
+                            tuple(out.shape), out.data_ptr())
+        self.session.run_with_iobinding(binding)
+        return out
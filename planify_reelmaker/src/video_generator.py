@@ -1,5 +1,7 @@
 from moviepy.editor import ImageClip, concatenate_videoclips, AudioFileClip
+from moviepy.config import get_setting
 import os
+import subprocess
 import numpy as np
 from PIL import Image
 import pillow_heif
@@ -24,6 +26,20 @@ def convert_heic_to_jpg_array(heic_path):
         return None
 
 
+# Reel frame size (vertical 9:16)
+REEL_W = 1080
+REEL_H = 1920
+
+
+def _to_reel_clip(clip):
+    """Resize + crop a clip to the 9:16 reel size (skipped when it already has that size)."""
+    if (clip.w, clip.h) == (REEL_W, REEL_H):
+        # Already reel-sized (e.g. padded upstream): avoid a per-frame resize/crop
+        return clip
+    clip = clip.resize(height=REEL_H)
+    return clip.crop(x_center=clip.w / 2, y_center=clip.h / 2, width=REEL_W, height=REEL_H)
+
+
 def create_reel_from_images(image_paths, music_path=None, output_path="output/reel.mp4",
                             fps=24, clip_duration=2):
     """
@@ -39,8 +55,6 @@ def create_reel_from_images(image_paths, music_path=None, output_path="output/re
     print("🎬 Starting video generation...")
     clips = []
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
     for img_path in image_paths:
         image_array = None
         if img_path.lower().endswith((".heic", ".heif")):
@@ -55,17 +69,105 @@ def create_reel_from_images(image_paths, music_path=None, output_path="output/re
                 clip = ImageClip(img_path, duration=clip_duration)
 
             # Resize + crop for 9:16 aspect ratio (Reel format)
-            clip = clip.resize(height=1920).crop(
-                x_center=clip.w / 2, y_center=clip.h / 2, width=1080, height=1920
-            )
-            clips.append(clip)
+            clips.append(_to_reel_clip(clip))
         except Exception as e:
             print(f"   - Skipping {os.path.basename(img_path)} due to error: {e}")
 
+    _write_reel(clips, music_path, output_path, fps)
+
+
+def create_reel_from_arrays(frames, music_path=None, output_path="output/reel.mp4",
+                            fps=24, clip_duration=2):
+    """
+    Creates a vertical video reel (9:16) from in-memory images, with no temp files.
+    Reel-sized frames are piped raw to ffmpeg; anything else goes through moviepy.
+
+    Args:
+        frames (list): List of RGB uint8 NumPy arrays (ideally already REEL_W x REEL_H).
+        music_path (str, optional): Background music file path.
+        output_path (str): Path to save the output video.
+        fps (int): Frames per second.
+        clip_duration (int): Duration (seconds) per image.
+    """
+    print("🎬 Starting video generation...")
+    if frames and all(f.shape == (REEL_H, REEL_W, 3) and f.dtype == np.uint8 for f in frames):
+        if _write_reel_ffmpeg(frames, music_path, output_path, fps, clip_duration):
+            return
+        print("⚠️  Falling back to moviepy for video writing.")
+
+    clips = []
+
+    for i, frame in enumerate(frames):
+        try:
+            clips.append(_to_reel_clip(ImageClip(frame, duration=clip_duration)))
+        except Exception as e:
+            print(f"   - Skipping frame {i} due to error: {e}")
+
+    _write_reel(clips, music_path, output_path, fps)
+
+
+def _write_reel_ffmpeg(frames, music_path, output_path, fps, clip_duration):
+    """
+    Encodes reel-sized RGB frames by writing them raw to ffmpeg's stdin
+    (-f rawvideo), skipping moviepy's per-frame compositing. Returns True on success.
+    Each image is written once: the input is declared at one frame per clip_duration
+    and ffmpeg repeats frames up to the output fps.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    has_music = bool(music_path and os.path.exists(music_path))
+
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{REEL_W}x{REEL_H}",
+           "-framerate", f"1/{clip_duration}", "-i", "-"]
+    if has_music:
+        cmd += ["-stream_loop", "-1", "-i", music_path] # Loop short music over the whole reel
+    # The last image is sent twice and the output cut at the exact length, so it is
+    # shown for its full clip_duration like the others
+    cmd += ["-r", str(fps), "-t", str(len(frames) * clip_duration), "-c:v", "libx264", "-pix_fmt", "yuv420p"]
+    if has_music:
+        cmd += ["-c:a", "aac", "-shortest"]
+        print("🎵 Background music added successfully.")
+    else:
+        print("⚠️  No valid music file found, proceeding without audio.")
+    cmd.append(output_path)
+
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    except Exception as e:
+        print(f"💥 ERROR: Could not start ffmpeg: {e}")
+        return False
+
+    write_error = None
+    try:
+        for frame in list(frames) + [frames[-1]]:
+            proc.stdin.write(memoryview(np.ascontiguousarray(frame)).cast("B")) # No tobytes() copy
+    except Exception as e: # e.g. BrokenPipeError when ffmpeg exits early
+        write_error = e
+        proc.kill()
+    finally:
+        # Closes stdin, collects stderr and reaps ffmpeg, whether or not the writes went through
+        _, err = proc.communicate()
+    err = err.decode(errors="replace").strip()
+
+    if write_error is not None:
+        print(f"💥 ERROR: Piping frames to ffmpeg failed: {write_error}. ffmpeg: {err}")
+        return False
+    if proc.returncode != 0:
+        print(f"💥 ERROR: ffmpeg exited with {proc.returncode}: {err}")
+        return False
+
+    print(f"✅ Reel created successfully: {output_path}")
+    return True
+
+
+def _write_reel(clips, music_path, output_path, fps):
+    """Concatenates the clips, adds the optional background music and writes the video."""
     if not clips:
         print("❌ No valid images found. Exiting.")
         return
 
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
     final_clip = concatenate_videoclips(clips, method="compose")
 
     # Optional background music